@@ -0,0 +1,10 @@
+"""Package "benchmarks".
+
+File:
+    __init__.py
+
+About:
+    Micro-benchmarks of the package hot paths.
+    Run them from the "src" directory, e.g.:
+    `python -m benchmarks.codecs`.
+"""
@@ -0,0 +1,73 @@
+"""Package "benchmarks".
+
+File:
+    batch.py
+
+About:
+    Compares a sliding-window flood count over a raid
+    of events computed with EventBatch and with a Python
+    loop over the `as_dict` output.
+"""
+
+import time
+import random
+from collections import defaultdict, deque
+from funcka_bots.events.batch import EventBatch
+from .samples import message_event
+
+EVENTS = 50000
+PEERS = 20
+USERS = 2000
+WINDOW = 10.0
+TEXTS = ("spam", "buy now", "hello", "")
+
+
+def raid() -> tuple:
+    rng = random.Random(1)
+    events, timestamps = [], []
+    now = 0.0
+    for event_id in range(EVENTS):
+        event = message_event(event_id)
+        event.peer = event.peer._replace(bpid=2000000000 + rng.randrange(PEERS))
+        event.user = event.user._replace(uuid=rng.randrange(USERS))
+        event.message = event.message._replace(text=rng.choice(TEXTS))
+        now += rng.expovariate(1000.0)
+        events.append(event)
+        timestamps.append(now)
+
+    return events, timestamps
+
+
+def loop(events: list, timestamps: list) -> list:
+    windows = defaultdict(deque)
+    counts = []
+    for event, timestamp in zip(events, timestamps):
+        obj = event.as_dict()
+        window = windows[obj["peer"]["bpid"], obj["user"]["uuid"]]
+        window.append(timestamp)
+        while window[0] < timestamp - WINDOW:
+            window.popleft()
+        counts.append(len(window))
+
+    return counts
+
+
+def vectorized(events: list, timestamps: list) -> list:
+    batch = EventBatch.from_events(events, timestamps)
+    return batch.window_count(("peer_bpid", "user_uuid"), WINDOW).tolist()
+
+
+def main() -> None:
+    events, timestamps = raid()
+    print(f"{'method':<12} {'ms':>8}")
+    results = []
+    for name, func in (("loop", loop), ("EventBatch", vectorized)):
+        start = time.perf_counter()
+        results.append(func(events, timestamps))
+        print(f"{name:<12} {(time.perf_counter() - start) * 1e3:>8.1f}")
+
+    assert results[0] == results[1]
+
+
+if __name__ == "__main__":
+    main()
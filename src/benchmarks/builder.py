@@ -0,0 +1,29 @@
+"""Package "benchmarks".
+
+File:
+    builder.py
+
+About:
+    Measures the cost of building an event
+    from its payloads with the EventBuilder.
+"""
+
+from funcka_bots.events import event_builder
+from .samples import message_payloads, button_payloads, warn_payloads, measure
+
+PAYLOADS = (
+    ("message_new", event_builder.build_vkevent, message_payloads),
+    ("button", event_builder.build_vkevent, button_payloads),
+    ("warn", event_builder.build_punishment, warn_payloads),
+)
+
+
+def main() -> None:
+    print(f"{'event':<12} {'build us':>9}")
+    for sample_name, build, factory in PAYLOADS:
+        payloads = factory()
+        print(f"{sample_name:<12} {measure(lambda: build(**payloads)):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Package "benchmarks".
+
+File:
+    codecs.py
+
+About:
+    Compares the payload size and the encode/decode
+    time of the broker codecs on realistic events.
+"""
+
+from funcka_bots.broker.codecs import get_codec
+from .samples import SAMPLES, measure
+
+CODECS = ("dill", "pickle", "event+json", "event+msgpack", "wire")
+
+
+def main() -> None:
+    print(
+        f"{'event':<12} {'codec':<14} {'bytes':>6} {'encode us':>10} {'decode us':>10}"
+    )
+    for sample_name, factory in SAMPLES:
+        event = factory()
+        for codec_name in CODECS:
+            try:
+                codec = get_codec(codec_name)
+            except KeyError:
+                continue
+
+            data = codec.encode(event)
+            encode = measure(lambda: codec.encode(event))
+            decode = measure(lambda: codec.decode(data))
+            print(
+                f"{sample_name:<12} {codec_name:<14} {len(data):>6} "
+                f"{encode:>10.2f} {decode:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Package "benchmarks".
+
+File:
+    samples.py
+
+About:
+    File describing realistic event samples
+    shared by the benchmarks.
+"""
+
+import time
+from typing import Callable, List, Tuple
+from funcka_bots.events import BaseEvent, event_builder
+
+TEXT = (
+    "Всем привет! Напоминаю про правила беседы: без флуда, без рекламы "
+    "и без оскорблений. Нарушители получают предупреждение, три "
+    "предупреждения - исключение из беседы. "
+)
+
+
+def peer_payload(bpid: int = 2000000001) -> dict:
+    return {"bpid": bpid, "cid": bpid - 2000000000, "name": "STALCRAFT | Чат клана"}
+
+
+def user_payload(uuid: int = 123456789) -> dict:
+    return {
+        "uuid": uuid,
+        "name": "Иван Петров",
+        "firstname": "Иван",
+        "lastname": "Петров",
+        "nick": "ivan_petrov",
+    }
+
+
+def message_payloads(event_id: int = 1, forwards: int = 3) -> dict:
+    """Returns the builder arguments of a "message_new" event
+    with a reply, forwarded messages and attachments.
+    """
+    return dict(
+        event_type="message_new",
+        event_id=event_id,
+        peer=peer_payload(),
+        user=user_payload(),
+        message={
+            "cmid": 48213,
+            "text": TEXT,
+            "attachments": ["photo123456789_457239017", "doc123456789_673456"],
+        },
+        message_reply={"uuid": 987654321, "cmid": 48200, "text": TEXT[:80]},
+        message_forward=[
+            {"uuid": 987654321 + i, "cmid": 48100 + i, "text": TEXT}
+            for i in range(forwards)
+        ],
+    )
+
+
+def message_event(event_id: int = 1, forwards: int = 3) -> BaseEvent:
+    """Builds a "message_new" event with a reply,
+    forwarded messages and attachments.
+    """
+    return event_builder.build_vkevent(**message_payloads(event_id, forwards))
+
+
+def button_payloads(event_id: int = 2) -> dict:
+    """Returns the builder arguments of a "message_event" (button press) event."""
+    return dict(
+        event_type="button",
+        event_id=event_id,
+        peer=peer_payload(),
+        user=user_payload(),
+        button={
+            "cmid": 48213,
+            "beid": "a1b2c3d4e5f6",
+            "payload": {"action_name": "close_menu", "keyboard_owner": 123456789},
+        },
+    )
+
+
+def button_event(event_id: int = 2) -> BaseEvent:
+    """Builds a "message_event" (button press) event."""
+    return event_builder.build_vkevent(**button_payloads(event_id))
+
+
+def warn_payloads() -> dict:
+    """Returns the builder arguments of a "warn" punishment
+    with the offending message.
+    """
+    return dict(
+        punishment_type="warn",
+        punishment_comment="Флуд",
+        peer=peer_payload(),
+        user=user_payload(),
+        message={"cmid": 48213, "text": TEXT, "attachments": []},
+        warn={"points": 1},
+    )
+
+
+def warn_punishment() -> BaseEvent:
+    """Builds a "warn" punishment with the offending message."""
+    return event_builder.build_punishment(**warn_payloads())
+
+
+SAMPLES: List[Tuple[str, Callable[[], BaseEvent]]] = [
+    ("message_new", message_event),
+    ("button", button_event),
+    ("warn", warn_punishment),
+]
+
+
+def measure(func: Callable[[], object], number: int = 20000) -> float:
+    """Returns the best time of a single call, in microseconds,
+    over three rounds of `number` calls.
+    """
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+
+    return best / number * 1e6
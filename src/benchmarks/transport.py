@@ -0,0 +1,106 @@
+"""Package "benchmarks".
+
+File:
+    transport.py
+
+About:
+    Compares the one-way publish-to-receive latency
+    of LocalBroker and Broker between two processes.
+    Broker is measured only if RabbitMQ is reachable
+    with the RABBITMQ_* environment variables.
+"""
+
+import os
+import time
+import multiprocessing
+from statistics import quantiles
+from typing import Callable, List
+from loguru import logger
+from funcka_bots.broker import Broker, LocalBroker
+from funcka_bots.broker.base import BaseBroker
+from funcka_bots.credentials import RabbitMQCredentials
+from .samples import message_event
+
+QUEUE = "benchmark.transport"
+MESSAGES = 5000
+WARMUP = 100
+PAUSE = 0.0002
+
+
+def rabbitmq_creds() -> RabbitMQCredentials:
+    return RabbitMQCredentials(
+        host=os.getenv("RABBITMQ_HOST", "localhost"),
+        port=int(os.getenv("RABBITMQ_PORT", "5672")),
+        vhost=os.getenv("RABBITMQ_VHOST", "/"),
+        user=os.getenv("RABBITMQ_USER", "guest"),
+        pswd=os.getenv("RABBITMQ_PSWD", "guest"),
+    )
+
+
+def listener(factory: Callable[[], BaseBroker], results: multiprocessing.Queue) -> None:
+    latencies = []
+    for sent, _ in factory().listen(QUEUE):
+        latencies.append(time.monotonic_ns() - sent)
+        if len(latencies) == MESSAGES:
+            break
+
+    results.put(latencies[WARMUP:])
+
+
+def run(
+    name: str, factory: Callable[[], BaseBroker], ready: Callable[[], bool]
+) -> None:
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=listener, args=(factory, results))
+    process.start()
+    while not ready():
+        time.sleep(0.05)
+
+    broker = factory()
+    event = message_event()
+    for _ in range(MESSAGES):
+        broker.publish((time.monotonic_ns(), event), QUEUE)
+        time.sleep(PAUSE)
+
+    latencies: List[int] = results.get()
+    process.join()
+    broker.close()
+
+    percentiles = quantiles(latencies, n=100)
+    print(
+        f"{name:<8} {percentiles[49] / 1e3:>8.1f} {percentiles[94] / 1e3:>8.1f} "
+        f"{percentiles[98] / 1e3:>8.1f}"
+    )
+
+
+def main() -> None:
+    # Logging of every message would dominate the latency.
+    logger.remove()
+
+    print(f"{'broker':<8} {'p50 us':>8} {'p95 us':>8} {'p99 us':>8}")
+    local = LocalBroker()
+    run(
+        "local",
+        LocalBroker,
+        lambda: os.path.exists(local._socket_path(QUEUE)),
+    )
+
+    creds = rabbitmq_creds()
+    probe = Broker(creds=creds)
+    if probe.connection is None:
+        print(f"{'amqp':<8} RabbitMQ is unreachable, skipped.")
+        return
+
+    channel = probe._get_channel()
+    probe._declare_queue(QUEUE, channel)
+    channel.queue_purge(QUEUE)
+    run(
+        "amqp",
+        lambda: Broker(creds=creds, codec="pickle"),
+        lambda: probe.queue_stats(QUEUE).consumers > 0,
+    )
+    probe.close()
+
+
+if __name__ == "__main__":
+    main()
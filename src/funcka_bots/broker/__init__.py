@@ -7,7 +7,52 @@ About:
     Initializing the "broker" module.
 """
 
-from .broker import Broker
+from .broker import Broker, AsyncBroker
+from .local import LocalBroker, create_broker
+from .objects import PublishResult, QueueStats, LogRecord, ReplayResult
+from .delivery import Delivery
+from .envelope import Envelope
+from .dedup import Deduplicator
+from .outbox import Outbox
+from .codecs import Codec, register_codec, get_codec
+from .compression import Compressor, register_compressor
+from .stats import BrokerStats
+from .consumer import ConsumerPool
+from .monitor import QueueMonitor
+from .autoscaler import Autoscaler
+from .sharding import peer_key, user_key, shard_for, claim_shards
+from .routing import routing_key
+from .eventlog import EventLogWriter, EventLogReader
+from .replay import Replayer
 
-
-__all__ = ("Broker",)
+__all__ = (
+    "Broker",
+    "AsyncBroker",
+    "LocalBroker",
+    "create_broker",
+    "PublishResult",
+    "QueueStats",
+    "LogRecord",
+    "ReplayResult",
+    "Delivery",
+    "Envelope",
+    "Deduplicator",
+    "Outbox",
+    "Codec",
+    "register_codec",
+    "get_codec",
+    "Compressor",
+    "register_compressor",
+    "BrokerStats",
+    "ConsumerPool",
+    "QueueMonitor",
+    "Autoscaler",
+    "peer_key",
+    "user_key",
+    "shard_for",
+    "claim_shards",
+    "routing_key",
+    "EventLogWriter",
+    "EventLogReader",
+    "Replayer",
+)
@@ -0,0 +1,296 @@
+"""Module "broker".
+
+File:
+    autoscaler.py
+
+About:
+    File describing the Autoscaler class, which runs
+    competing consumers of a queue and adjusts their
+    count to the backlog and the handler latency.
+"""
+
+import time
+import multiprocessing
+from math import ceil
+from threading import Event, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pika.exceptions import AMQPError
+from loguru import logger
+from funcka_bots.credentials import RabbitMQCredentials
+from .broker import Broker
+from .objects import QueueStats
+
+
+def _consume(
+    creds: RabbitMQCredentials,
+    queue_name: str,
+    handler: Callable[[Any], Any],
+    broker_options: Dict[str, Any],
+    prefetch_count: int,
+    stopped: Event,
+    handled: Any,
+    busy_time: Any,
+) -> None:
+    """Worker loop. Consumes the queue over a connection
+    of its own until `stopped` is set, acknowledging each
+    message after its handler has finished.
+    """
+    broker = Broker(creds=creds, **broker_options)
+    channel = broker._get_channel()
+    broker._declare_queue(queue_name=queue_name, channel=channel)
+    channel.basic_qos(prefetch_count=prefetch_count)
+
+    try:
+        for method, properties, body in channel.consume(
+            queue=queue_name, inactivity_timeout=1.0
+        ):
+            if stopped.is_set():
+                break
+
+            if method is None:
+                continue
+
+            key = broker._dedup_key(queue_name, properties)
+            if broker._is_duplicate(key):
+                channel.basic_ack(delivery_tag=method.delivery_tag)
+                continue
+
+            started = time.perf_counter()
+            try:
+                obj = broker._deserialize(
+                    body, properties.content_type, properties.content_encoding
+                )
+                handler(obj)
+
+            except Exception as error:
+                logger.error(
+                    f"Handler failed on a message from '{queue_name}': {error}"
+                )
+                if broker.quarantine:
+                    broker._fail_message(
+                        queue_name=queue_name,
+                        body=body,
+                        properties=properties,
+                        error=error,
+                    )
+                    channel.basic_ack(delivery_tag=method.delivery_tag)
+                else:
+                    channel.basic_reject(
+                        delivery_tag=method.delivery_tag, requeue=False
+                    )
+
+            else:
+                channel.basic_ack(delivery_tag=method.delivery_tag)
+                broker._remember(key)
+
+            with handled.get_lock():
+                handled.value += 1
+            with busy_time.get_lock():
+                busy_time.value += time.perf_counter() - started
+
+    finally:
+        # Prefetched messages that were not handled are requeued.
+        if channel.is_open:
+            channel.cancel()
+            channel.close()
+
+        broker.close()
+
+
+class Autoscaler:
+    """Autoscaling runner of queue consumers.
+
+    Description:
+        Each worker is a thread, or a process, consuming the
+        queue over a connection of its own, so the workers
+        compete for messages and their order is not kept.
+        Every `interval` seconds the queue depth is sampled
+        and the count of workers is set to what is needed to
+        keep up with the incoming rate and to drain the backlog
+        within `target_drain_time`, given the mean handler
+        latency over the interval. Workers are added at once,
+        but removed one per interval, to ride out short lulls.
+
+    Attributes:
+        workers (int): Current count of workers.
+        last_sample (Optional[QueueStats]): Latest sample of the queue.
+        rate (float): Count of messages handled per second over the last interval.
+        latency (float): Mean handler latency over the last interval, in seconds.
+    """
+
+    def __init__(
+        self,
+        creds: RabbitMQCredentials,
+        queue_name: str,
+        handler: Callable[[Any], Any],
+        min_workers: int = 1,
+        max_workers: int = 8,
+        interval: float = 5.0,
+        target_drain_time: float = 30.0,
+        prefetch_count: int = 10,
+        use_processes: bool = False,
+        broker_options: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        :param RabbitMQCredentials creds: RabbitMQ credentials.
+        :param str queue_name: Name of the RabbitMQ queue to consume.
+        :param Callable handler: Handler called with each deserialized object.
+        :param int min_workers: Minimum count of workers. `Default: 1`.
+        :param int max_workers: Maximum count of workers. `Default: 8`.
+        :param float interval: Time between the scaling decisions, in seconds. `Default: 5.0`.
+        :param float target_drain_time: Time the backlog should be drained in, in seconds. `Default: 30.0`.
+        :param int prefetch_count: Count of messages in flight per worker. `Default: 10`.
+        :param bool use_processes: Run workers in processes, the handler must be picklable. `Default: False`.
+        :param Optional[Dict[str, Any]] broker_options: Keyword arguments of the worker brokers. `Default: None`.
+        """
+        self.creds = creds
+        self.queue_name = queue_name
+        self.handler = handler
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.interval = interval
+        self.target_drain_time = target_drain_time
+        self.prefetch_count = prefetch_count
+        self.broker_options = broker_options or {}
+        self.last_sample: Optional[QueueStats] = None
+        self.rate = 0.0
+        self.latency = 0.0
+
+        if use_processes:
+            context = multiprocessing.get_context()
+            self._event_class, self._worker_class = context.Event, context.Process
+        else:
+            context = multiprocessing
+            self._event_class, self._worker_class = Event, Thread
+
+        self._handled = context.Value("q", 0)
+        self._busy_time = context.Value("d", 0.0)
+        self._workers: List[Tuple[Any, Any]] = []
+        self._stopped = Event()
+
+    @property
+    def workers(self) -> int:
+        return len(self._workers)
+
+    def run(self) -> None:
+        """Runs the workers and scales them until `stop` is called.
+        Blocks the calling thread.
+        """
+        broker = Broker(creds=self.creds)
+        self._scale_to(self.min_workers)
+
+        logger.info(
+            f"Consuming the queue '{self.queue_name}' with "
+            f"{self.min_workers}..{self.max_workers} workers..."
+        )
+        handled, busy_time = 0, 0.0
+        try:
+            while not self._stopped.wait(self.interval):
+                self._reap()
+                handled, busy_time = self._measure(handled, busy_time)
+
+                try:
+                    self.last_sample = broker.queue_stats(self.queue_name)
+
+                except AMQPError as e:
+                    logger.info(
+                        f"Failed to sample the queue '{self.queue_name}': {e!r}"
+                    )
+                    if broker.connection is None or broker.connection.is_closed:
+                        broker._connect(attempts=1)
+                    continue
+
+                self._scale_to(self._desired_workers(self.last_sample.messages))
+
+        finally:
+            self._scale_to(0)
+            broker.close()
+
+    def stop(self) -> None:
+        """Stops the runner. Can be called from any thread."""
+        self._stopped.set()
+
+    def metrics(self) -> dict:
+        """Returns the runner state, for logging and metrics export."""
+        sample = self.last_sample
+        return {
+            "queue": self.queue_name,
+            "messages": None if sample is None else sample.messages,
+            "consumers": None if sample is None else sample.consumers,
+            "workers": self.workers,
+            "rate": self.rate,
+            "latency": self.latency,
+        }
+
+    def _measure(self, handled: int, busy_time: float) -> Tuple[int, float]:
+        total_handled = self._handled.value
+        total_busy_time = self._busy_time.value
+        count = total_handled - handled
+        self.rate = count / self.interval
+        if count:
+            self.latency = (total_busy_time - busy_time) / count
+
+        return total_handled, total_busy_time
+
+    def _desired_workers(self, backlog: int) -> int:
+        if self.latency:
+            # Workers busy with the incoming messages, plus
+            # the ones needed to drain the backlog in time.
+            needed = ceil(
+                self.rate * self.latency
+                + backlog * self.latency / self.target_drain_time
+            )
+        else:
+            # Nothing was handled yet, so there is no latency to go by.
+            needed = self.workers + 1 if backlog else self.workers
+
+        desired = max(self.min_workers, min(self.max_workers, needed))
+        if desired < self.workers:
+            return self.workers - 1
+
+        return desired
+
+    def _scale_to(self, count: int) -> None:
+        if count != self.workers:
+            logger.info(
+                f"Scaling the consumers of '{self.queue_name}' "
+                f"from {self.workers} to {count}."
+            )
+
+        while self.workers < count:
+            stopped = self._event_class()
+            worker = self._worker_class(
+                target=_consume,
+                args=(
+                    self.creds,
+                    self.queue_name,
+                    self.handler,
+                    self.broker_options,
+                    self.prefetch_count,
+                    stopped,
+                    self._handled,
+                    self._busy_time,
+                ),
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append((worker, stopped))
+
+        # Workers check their events once a second, so all
+        # of them are signalled before any is waited for.
+        removed, self._workers = self._workers[count:], self._workers[:count]
+        for _, stopped in removed:
+            stopped.set()
+
+        for worker, _ in removed:
+            worker.join()
+
+    def _reap(self) -> None:
+        # Workers that died, e.g. on a lost connection, are replaced
+        # by the following scaling decision.
+        alive = [
+            (worker, stopped) for worker, stopped in self._workers if worker.is_alive()
+        ]
+        if len(alive) < len(self._workers):
+            logger.info(f"{len(self._workers) - len(alive)} consumers have exited.")
+            self._workers = alive
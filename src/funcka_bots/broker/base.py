@@ -1,51 +1,208 @@
-from typing import ByteString, Any, Optional
-from pika import BlockingConnection, ConnectionParameters
-from pika.adapters.blocking_connection import BlockingChannel
-from pika.credentials import PlainCredentials
-from pika.exceptions import AMQPConnectionError
+import time
+import traceback
+from math import ceil
+from typing import ByteString, Any, Dict, Optional, Set, Tuple
 from funcka_bots.credentials import RabbitMQCredentials
-from loguru import logger
-import dill as pickle
+from funcka_bots.events import BaseEvent
+from .codecs import get_codec, get_codec_by_content_type
+from .compression import get_compressor
+from .eventlog import EventLogWriter
+from .stats import BrokerStats
+
+Properties = Dict[str, Any]
+
+FAILURES_HEADER = "x-funcka-failures"
+ERROR_HEADER = "x-funcka-error"
+QUARANTINE_SUFFIX = ".quarantine"
+MAX_ERROR_LENGTH = 8192
+DELAY_INFIX = ".delay."
+
+ROUTING_ATTRIBUTES = ("event_type", "event_id", "punishment_type")
 
 
 class BaseBroker:
-    def __init__(self, creds: RabbitMQCredentials) -> None:
-        self.params = ConnectionParameters(
-            host=creds.host,
-            port=creds.port,
-            virtual_host=creds.vhost,
-            credentials=PlainCredentials(
-                username=creds.user,
-                password=creds.pswd,
-            ),
-            heartbeat=0,
-        )
-        self._connect()
-
-    def _connect(self, attempts: int = 5) -> None:
-        try:
-            attempts -= 1
-            self.connection = BlockingConnection(self.params)
-
-        except AMQPConnectionError as e:
-            logger.info(f"Error connecting to RabbitMQ: {e}")
-            if attempts > 0:
-                logger.info("Reconnecting... ")
-                self._connect(attempts)
-
-            else:
-                logger.error("Failed to connect to RabbitMQ.")
-
-    def _get_channel(self, channel_id: Optional[int] = None) -> BlockingChannel:
-        return self.connection.channel(channel_number=channel_id)
-
-    def _declare_queue(self, queue_name: str, channel: BlockingChannel) -> None:
-        channel.queue_declare(queue=queue_name, durable=True)
+    def __init__(
+        self,
+        creds: RabbitMQCredentials,
+        codec: str = "dill",
+        compression: Optional[str] = None,
+        compression_threshold: int = 1024,
+        quarantine: bool = False,
+        max_failures: int = 3,
+    ) -> None:
+        self.creds = creds
+        self.codec = get_codec(codec)
+        self.compressor = None if compression is None else get_compressor(compression)
+        self.compression_threshold = compression_threshold
+        self.quarantine = quarantine
+        self.max_failures = max_failures
+        self.stats = BrokerStats()
+        self._declared_queues: Set[str] = set()
+        self._declared_exchanges: Set[str] = set()
+        self._exchange_types: Dict[str, str] = {}
+        self.recorder: Optional[EventLogWriter] = None
+        self._record_published = False
+        self._record_consumed = False
+
+    def record(
+        self,
+        recorder: Optional[EventLogWriter],
+        published: bool = True,
+        consumed: bool = True,
+    ) -> None:
+        """Tees the messages passing through the broker into
+        an event log, e.g. to replay production traffic later.
+
+        Description:
+            Published messages are recorded when serialized,
+            consumed ones when deserialized, so messages of
+            envelopes are recorded only if their object is loaded.
+
+        :param Optional[EventLogWriter] recorder: Event log writer, None to stop recording.
+        :param bool published: Record the published messages. `Default: True`.
+        :param bool consumed: Record the consumed messages. `Default: True`.
+        """
+        self.recorder = recorder
+        self._record_published = recorder is not None and published
+        self._record_consumed = recorder is not None and consumed
+
+    def _serialize(self, obj: Any) -> Tuple[ByteString, Properties]:
+        """Encodes an object with the broker codec and compresses
+        it, if the compression is enabled and the encoded object
+        is larger than the threshold. The event ID, if the object
+        has one, is sent as the AMQP message ID, and the routing
+        fields of events are sent as the AMQP headers.
+
+        :param Any obj: Object to be serialized.
+        :return: Message body and AMQP properties describing it.
+        :rtype: Tuple[ByteString, Properties]
+        """
+        data = self.codec.encode(obj)
+        properties = {"content_type": self.codec.content_type}
+        if self._record_published:
+            self.recorder.append(data, self.codec.content_type)
+
+        event_id = getattr(obj, "event_id", None)
+        if event_id is not None:
+            properties["message_id"] = str(event_id)
+
+        if isinstance(obj, BaseEvent):
+            properties["headers"] = self._routing_headers(obj)
+
+        if self.compressor is not None and len(data) > self.compression_threshold:
+            started = time.thread_time()
+            compressed = self.compressor.compress(data)
+            self.stats.compression_time += time.thread_time() - started
+            self.stats.compressed_messages += 1
+            self.stats.raw_bytes += len(data)
+            self.stats.compressed_bytes += len(compressed)
+
+            data = compressed
+            properties["content_encoding"] = self.compressor.name
+
+        return data, properties
 
     @staticmethod
-    def _serialize(obj: Any) -> ByteString:
-        return pickle.dumps(obj=obj, protocol=pickle.HIGHEST_PROTOCOL)
+    def _routing_headers(event: BaseEvent) -> Dict[str, Any]:
+        """Collects the fields routers and filters need
+        to handle an event without deserializing it.
+        """
+        headers = {}
+        for attr in ROUTING_ATTRIBUTES:
+            value = getattr(event, attr, None)
+            if value is not None:
+                headers[attr] = value
+
+        peer = getattr(event, "peer", None)
+        if peer is not None:
+            headers["peer_bpid"] = peer.bpid
+
+        user = getattr(event, "user", None)
+        if user is not None:
+            headers["user_uuid"] = user.uuid
+
+        return headers
+
+    def _deserialize(
+        self,
+        data: ByteString,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+    ) -> Any:
+        """Decompresses a message body, if it is marked with
+        a content encoding, and decodes it with the codec
+        matching its AMQP content type.
+
+        :param ByteString data: Message body.
+        :param Optional[str] content_type: AMQP content type of the message.
+        :param Optional[str] content_encoding: AMQP content encoding of the message.
+        :rtype: Any
+        """
+        if content_encoding:
+            started = time.thread_time()
+            data = get_compressor(content_encoding).decompress(data)
+            self.stats.decompression_time += time.thread_time() - started
+            self.stats.decompressed_messages += 1
+
+        if self._record_consumed:
+            self.recorder.append(data, content_type)
+
+        return get_codec_by_content_type(content_type).decode(data)
 
     @staticmethod
-    def _deserialize(data: ByteString) -> Any:
-        return pickle.loads(str=data)
+    def _delay_queue(queue_name: str, delay: float) -> str:
+        """Returns the name of the delay queue holding messages
+        for the queue for `delay` seconds, rounded up to a second.
+        """
+        return f"{queue_name}{DELAY_INFIX}{ceil(delay) * 1000}"
+
+    def _queue_arguments(self, queue_name: str) -> Optional[Dict[str, Any]]:
+        """Returns the arguments the queue is declared with.
+
+        Description:
+            With the quarantine enabled, messages rejected without
+            requeueing are dead-lettered to the "<queue>.quarantine"
+            queue through the default exchange.
+
+            Messages of a "<queue>.delay.<ms>" queue expire after
+            the delay and are dead-lettered to the queue. All of
+            them live for the same time, so they expire in order
+            and none is held back behind a longer one.
+        """
+        target, infix, ttl = queue_name.rpartition(DELAY_INFIX)
+        if infix and ttl.isdigit():
+            return {
+                "x-message-ttl": int(ttl),
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": target,
+            }
+
+        if not self.quarantine or queue_name.endswith(QUARANTINE_SUFFIX):
+            return None
+
+        return {
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": queue_name + QUARANTINE_SUFFIX,
+        }
+
+    def _failure_route(
+        self, queue_name: str, headers: Optional[Dict[str, Any]], error: BaseException
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Counts a failure of a message and chooses where to republish it.
+
+        :param str queue_name: Name of the queue the message was received from.
+        :param Optional[Dict[str, Any]] headers: AMQP headers of the message.
+        :param BaseException error: Error the handler failed with.
+        :return: Target queue name and the updated headers.
+        :rtype: Tuple[str, Dict[str, Any]]
+        """
+        headers = dict(headers or {})
+        failures = headers.get(FAILURES_HEADER, 0) + 1
+        headers[FAILURES_HEADER] = failures
+
+        if failures < self.max_failures:
+            return queue_name, headers
+
+        formatted = "".join(traceback.format_exception(error))
+        headers[ERROR_HEADER] = formatted[-MAX_ERROR_LENGTH:]
+        return queue_name + QUARANTINE_SUFFIX, headers
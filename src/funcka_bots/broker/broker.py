@@ -1,62 +1,1494 @@
 """Module "broker".
 
 File:
-    publisher.py
+    broker.py
 
 About:
-    File describing the implementation of the
-    Publisher class, which facilitates publishing
-    serialized objects to Redis channels.
+    File describing the Sync and Async RabbitMQ broker
+    classes, which publish serialized objects to queues
+    and listen to them.
 """
 
 import time
-from typing import Any
+import asyncio
+import warnings
+from collections import deque
+from functools import partial
+from threading import Event, Lock, RLock, Thread
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    AsyncIterator,
+    ByteString,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+from pika import BasicProperties, BlockingConnection, ConnectionParameters, spec
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.credentials import PlainCredentials
+from pika.exceptions import (
+    AMQPError,
+    AMQPConnectionError,
+    ChannelClosed,
+    ChannelClosedByBroker,
+    ChannelWrongStateError,
+    ConnectionWrongStateError,
+)
+from aio_pika import connect_robust, Message
+from aio_pika.abc import (
+    AbstractExchange,
+    AbstractRobustChannel,
+    AbstractRobustConnection,
+)
 from loguru import logger
-from .base import BaseBroker
+from funcka_bots.credentials import RabbitMQCredentials
+from .base import (
+    BaseBroker,
+    Properties,
+    FAILURES_HEADER,
+    ERROR_HEADER,
+    QUARANTINE_SUFFIX,
+)
+from .objects import PublishResult, QueueStats
+from .delivery import Delivery
+from .envelope import Envelope
+from .dedup import Deduplicator
+from .outbox import Outbox
+from .confirms import ConfirmTracker
+from .scheduler import TimerWheel
+from .sharding import peer_key, shard_for, shard_queue_name
+from .routing import routing_key as default_routing_key
+
+# Time before a delayed message that failed to be sent is retried, in seconds.
+TIMER_RETRY_DELAY = 1.0
+
+# AMQP properties carried over to the republished messages.
+MESSAGE_PROPERTIES = (
+    "content_type",
+    "content_encoding",
+    "delivery_mode",
+    "priority",
+    "correlation_id",
+    "reply_to",
+    "expiration",
+    "message_id",
+    "timestamp",
+    "type",
+    "user_id",
+    "app_id",
+    "cluster_id",
+)
 
 
 class Broker(BaseBroker):
     """RabbitMQ broker class."""
 
-    def publish(self, obj: Any, queue_name: str) -> None:
+    def __init__(
+        self,
+        creds: RabbitMQCredentials,
+        codec: str = "dill",
+        compression: Optional[str] = None,
+        compression_threshold: int = 1024,
+        quarantine: bool = False,
+        max_failures: int = 3,
+        deduplicator: Optional[Deduplicator] = None,
+        outbox_path: Optional[str] = None,
+        local_delay_limit: float = 0.0,
+    ) -> None:
+        super().__init__(
+            creds=creds,
+            codec=codec,
+            compression=compression,
+            compression_threshold=compression_threshold,
+            quarantine=quarantine,
+            max_failures=max_failures,
+        )
+        self.deduplicator = deduplicator
+        self.local_delay_limit = local_delay_limit
+        self._timers: Optional[TimerWheel] = None
+        self._timer_connection: Optional[BlockingConnection] = None
+        self._timer_channel: Optional[BlockingChannel] = None
+        self.params = ConnectionParameters(
+            host=creds.host,
+            port=creds.port,
+            virtual_host=creds.vhost,
+            credentials=PlainCredentials(
+                username=creds.user,
+                password=creds.pswd,
+            ),
+            heartbeat=0,
+        )
+        self._channel: Optional[BlockingChannel] = None
+        self._confirm_channel: Optional[BlockingChannel] = None
+        self._confirms = ConfirmTracker()
+        self._channel_lock = RLock()
+        self.connection: Optional[BlockingConnection] = None
+
+        self.outbox = None if outbox_path is None else Outbox(outbox_path)
+        self._drainer_connection: Optional[BlockingConnection] = None
+        self._drainer_channel: Optional[BlockingChannel] = None
+        self._drainer_confirms = ConfirmTracker()
+        self._spool_lock = Lock()
+        self._offline = Event()
+        self._closing = Event()
+
+        if self.outbox is None:
+            self._connect()
+
+        else:
+            # Publishing must not wait for RabbitMQ, the publishers
+            # reconnect once the outbox drainer has replayed the outbox.
+            if not self._connect(attempts=1):
+                self._offline.set()
+
+            if len(self.outbox):
+                self._offline.set()
+
+            self._drainer = Thread(target=self._drain_outbox, daemon=True)
+            self._drainer.start()
+
+    def _connect(
+        self, attempts: int = 5, backoff: float = 0.5, max_backoff: float = 30.0
+    ) -> bool:
+        """Connects to RabbitMQ, retrying with an exponential backoff.
+
+        :param int attempts: Count of connection attempts. `Default: 5`.
+        :param float backoff: Delay before the first retry, in seconds. `Default: 0.5`.
+        :param float max_backoff: Maximum delay between retries, in seconds. `Default: 30.0`.
+        :return: The connection was established.
+        :rtype: bool
+        """
+        for attempt in range(attempts):
+            try:
+                connection = BlockingConnection(self.params)
+
+            except AMQPConnectionError as e:
+                logger.info(f"Error connecting to RabbitMQ: {e}")
+                if attempt + 1 < attempts:
+                    delay = min(backoff * 2**attempt, max_backoff)
+                    logger.info(f"Reconnecting in {delay:.1f}s... ")
+                    if self._closing.wait(delay):
+                        break
+
+                continue
+
+            with self._channel_lock:
+                self.connection = connection
+                self._channel = None
+                self._confirm_channel = None
+                self._declared_queues.clear()
+                self._declared_exchanges.clear()
+
+            return True
+
+        logger.error("Failed to connect to RabbitMQ.")
+        return False
+
+    def close(self) -> None:
+        """Stops the outbox drainer and closes the connection.
+        Messages still pending in the local timer wheel are moved
+        to the RabbitMQ delay queues with their remaining delay.
+        """
+        if self._timers is not None:
+            for delay, (body, properties, queue_name) in self._timers.stop():
+                self._dispatch(body, properties, self._delay_queue(queue_name, delay))
+
+            self._timers = None
+            self._close_timer_connection()
+
+        self._closing.set()
+        self._offline.set()
+        if self.outbox is not None:
+            self._drainer.join()
+            self.outbox.close()
+
+        with self._channel_lock:
+            if self.connection is not None and self.connection.is_open:
+                self.connection.close()
+
+    def _get_channel(self, channel_id: Optional[int] = None) -> BlockingChannel:
+        if self.connection is None or self.connection.is_closed:
+            raise ConnectionWrongStateError("Not connected to RabbitMQ.")
+
+        return self.connection.channel(channel_number=channel_id)
+
+    def _get_publish_channel(self) -> BlockingChannel:
+        """Returns the long-lived publishing channel,
+        reopening it if it was closed.
+
+        Must be called with `_channel_lock` held.
+        """
+        if self._channel is None or self._channel.is_closed:
+            self._channel = self._get_channel()
+
+        return self._channel
+
+    def _get_confirm_channel(self) -> BlockingChannel:
+        """Returns the long-lived channel in publisher confirms mode,
+        reopening it if it was closed.
+
+        Must be called with `_channel_lock` held.
+        """
+        if self._confirm_channel is None or self._confirm_channel.is_closed:
+            self._confirm_channel = self._confirms.open(self._get_channel())
+
+        return self._confirm_channel
+
+    def _declare_queue(self, queue_name: str, channel: BlockingChannel) -> None:
+        if queue_name in self._declared_queues:
+            return
+
+        arguments = self._queue_arguments(queue_name)
+        if arguments is not None:
+            self._declare_queue(arguments["x-dead-letter-routing-key"], channel)
+
+        channel.queue_declare(queue=queue_name, durable=True, arguments=arguments)
+        self._declared_queues.add(queue_name)
+
+    def _declare_target(
+        self, queue_name: str, exchange: str, channel: BlockingChannel
+    ) -> None:
+        # Queues bound to an exchange are declared by `bind_queue`.
+        if exchange:
+            self._declare_exchange(exchange, channel)
+        else:
+            self._declare_queue(queue_name=queue_name, channel=channel)
+
+    def _declare_exchange(self, exchange: str, channel: BlockingChannel) -> None:
+        if exchange in self._declared_exchanges:
+            return
+
+        channel.exchange_declare(
+            exchange=exchange,
+            exchange_type=self._exchange_types.get(exchange, "topic"),
+            durable=True,
+        )
+        self._declared_exchanges.add(exchange)
+
+    def queue_stats(self, queue_name: str) -> QueueStats:
+        """Samples the depth and the count of consumers of a queue.
+
+        Description:
+            The queue is declared passively, so the sample
+            neither creates the queue nor changes its arguments.
+
+        :param str queue_name: Name of the queue.
+        :raises ChannelClosedByBroker: The queue does not exist.
+        :rtype: QueueStats
+        """
+        with self._channel_lock:
+            channel = self._get_publish_channel()
+            try:
+                frame = channel.queue_declare(queue=queue_name, passive=True)
+
+            except ChannelClosedByBroker:
+                self._channel = None
+                raise
+
+        return QueueStats(
+            queue=queue_name,
+            messages=frame.method.message_count,
+            consumers=frame.method.consumer_count,
+            sampled_at=time.time(),
+        )
+
+    def declare_exchange(self, exchange: str, exchange_type: str = "topic") -> None:
+        """Declares a durable exchange.
+
+        Description:
+            Exchanges published to without being declared
+            first are declared as topic exchanges.
+
+        :param str exchange: Name of the exchange.
+        :param str exchange_type: Type of the exchange, `topic` or `fanout`. `Default: topic`.
+        """
+        self._exchange_types[exchange] = exchange_type
+        with self._channel_lock:
+            self._declare_exchange(exchange, self._get_publish_channel())
+
+    def bind_queue(
+        self,
+        queue_name: str,
+        exchange: str,
+        routing_key: str = "#",
+        exchange_type: str = "topic",
+    ) -> None:
+        """Declares a queue and binds it to an exchange.
+
+        :param str queue_name: Name of the queue.
+        :param str exchange: Name of the exchange.
+        :param str routing_key: Binding pattern, e.g. `vk.message.*`, ignored by fanout exchanges. `Default: #`.
+        :param str exchange_type: Type of the exchange, `topic` or `fanout`. `Default: topic`.
+        """
+        self._exchange_types.setdefault(exchange, exchange_type)
+        with self._channel_lock:
+            channel = self._get_publish_channel()
+            self._declare_exchange(exchange, channel)
+            self._declare_queue(queue_name=queue_name, channel=channel)
+            channel.queue_bind(
+                queue=queue_name, exchange=exchange, routing_key=routing_key
+            )
+
+    def _dedup_key(self, queue_name: str, properties: BasicProperties) -> Optional[str]:
+        if self.deduplicator is None or properties.message_id is None:
+            return None
+
+        # The same event may be legitimately routed to several queues.
+        return f"{queue_name}:{properties.message_id}"
+
+    def _is_duplicate(self, key: Optional[str]) -> bool:
+        return key is not None and self.deduplicator.seen(key)
+
+    def _remember(self, key: Optional[str]) -> None:
+        if key is not None:
+            self.deduplicator.remember(key)
+
+    def publish(self, obj: Any, queue_name: str, delay: Optional[float] = None) -> None:
         """Publishes a serialized object to a queue.
 
+        Description:
+            The object is sent over a long-lived channel shared
+            by all publishing threads, and the queue is declared
+            only once per connection. If the channel was closed
+            by a channel-level error, it is reopened and the
+            publication is retried once.
+
+            With an outbox set, the object is written to the
+            outbox instead while RabbitMQ is unreachable, and
+            sent in order once the connection is restored.
+
+            A delayed object is held in the "<queue>.delay.<ms>"
+            queue until its TTL expires, and then dead-lettered
+            to the queue, so timed actions need no polling.
+            Delays are rounded up to a second. Delays shorter
+            than `local_delay_limit` are kept in an in-process
+            timer wheel instead, with a 10ms resolution, which
+            publishes them over a connection of its own.
+
         :param Any obj: Object to be serialized and published.
-        :param str queue_name: Name of the Redis channel to publish to.
+        :param str queue_name: Name of the RabbitMQ queue to publish to.
+        :param Optional[float] delay: Time to hold the object back, in seconds. `Default: None`.
         """
-        channel = self._get_channel()
-        self._declare_queue(queue_name=queue_name, channel=channel)
+        body, properties = self._serialize(obj)
+
+        if delay is not None and delay > 0:
+            if delay < self.local_delay_limit:
+                self._get_timers().schedule(
+                    item=(body, properties, queue_name), delay=delay
+                )
+                logger.info(
+                    f"Object <{obj}> has been scheduled for the queue "
+                    f"<{queue_name}> in {delay}s"
+                )
+                return
+
+            queue_name = self._delay_queue(queue_name, delay)
+
+        if self._dispatch(body, properties, queue_name):
+            logger.info(f"Object <{obj}> has been sent to the queue <{queue_name}>")
+        else:
+            logger.info(f"Object <{obj}> has been spooled for the queue <{queue_name}>")
+
+    def publish_to_exchange(
+        self, obj: Any, exchange: str, routing_key: Optional[str] = None
+    ) -> None:
+        """Publishes a serialized object to an exchange.
+
+        Description:
+            The object is serialized once and RabbitMQ delivers
+            a copy to every queue bound with a matching pattern,
+            so several services can consume the same events.
+            By default, the routing key is derived from the event
+            type, e.g. "vk.message.new" or "punishment.warn".
+
+        :param Any obj: Object to be serialized and published.
+        :param str exchange: Name of the exchange to publish to.
+        :param Optional[str] routing_key: Routing key of the object. `Default: None`.
+        """
+        if routing_key is None:
+            routing_key = default_routing_key(obj)
+
+        body, properties = self._serialize(obj)
+        target = f"<{exchange}> with the key <{routing_key}>"
+        if self._dispatch(body, properties, routing_key, exchange=exchange):
+            logger.info(f"Object <{obj}> has been sent to the exchange {target}")
+        else:
+            logger.info(f"Object <{obj}> has been spooled for the exchange {target}")
+
+    def _dispatch(
+        self,
+        body: ByteString,
+        properties: Properties,
+        queue_name: str,
+        exchange: str = "",
+    ) -> bool:
+        """Sends a message, or writes it to the outbox while offline.
+
+        :return: The message was sent rather than spooled.
+        :rtype: bool
+        """
+        if self.outbox is not None and self._spool(
+            body, properties, queue_name, exchange=exchange
+        ):
+            return False
+
+        try:
+            if self.outbox is not None:
+                self._ensure_connection()
+
+            self._send(
+                body=body,
+                properties=properties,
+                queue_name=queue_name,
+                exchange=exchange,
+            )
+
+        except AMQPConnectionError as e:
+            if self.outbox is None:
+                raise
+
+            logger.info(f"RabbitMQ is unreachable: {e}. Spooling...")
+            self._spool(body, properties, queue_name, exchange=exchange, force=True)
+            return False
+
+        return True
+
+    def _ensure_connection(self) -> None:
+        """Reconnects the broker if its connection was lost during
+        an outage, after the outbox drainer has replayed the outbox.
+
+        :raises AMQPConnectionError: RabbitMQ is unreachable.
+        """
+        with self._channel_lock:
+            if self.connection is None or self.connection.is_closed:
+                if not self._connect(attempts=1):
+                    raise AMQPConnectionError("Not connected to RabbitMQ.")
+
+    def _get_timers(self) -> TimerWheel:
+        with self._channel_lock:
+            if self._timers is None:
+                self._timers = TimerWheel(callback=self._fire_timer)
+                self._timers.start()
+
+            return self._timers
+
+    def _fire_timer(self, item: Tuple[ByteString, Properties, str]) -> None:
+        """Publishes the message of a due timer.
+
+        Description:
+            Runs in the timer thread, so the message is sent over
+            a connection of the wheel, as pika connections must not
+            be used from several threads. A message that cannot
+            be sent is written to the outbox, or, without one,
+            rescheduled after `TIMER_RETRY_DELAY` seconds.
+        """
+        body, properties, queue_name = item
+        try:
+            if self._timer_connection is None or self._timer_connection.is_closed:
+                self._timer_connection = BlockingConnection(self.params)
+                self._timer_channel = self._timer_connection.channel()
+
+            self._declare_queue(queue_name=queue_name, channel=self._timer_channel)
+            self._timer_channel.basic_publish(
+                exchange="",
+                routing_key=queue_name,
+                body=body,
+                properties=BasicProperties(**properties),
+            )
+
+        except AMQPError as e:
+            self._close_timer_connection()
+            if self.outbox is not None:
+                logger.info(f"Failed to send a delayed message: {e}. Spooling...")
+                self._spool(body, properties, queue_name, force=True)
+            else:
+                logger.info(
+                    f"Failed to send a delayed message: {e}. "
+                    f"Retrying in {TIMER_RETRY_DELAY}s..."
+                )
+                self._timers.schedule(item=item, delay=TIMER_RETRY_DELAY)
+
+    def _close_timer_connection(self) -> None:
+        connection = self._timer_connection
+        self._timer_connection = None
+        self._timer_channel = None
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+
+            except AMQPError:
+                pass
+
+    def _spool(
+        self,
+        body: ByteString,
+        properties: Properties,
+        queue_name: str,
+        exchange: str = "",
+        force: bool = False,
+    ) -> bool:
+        """Writes a message to the outbox if the broker is offline,
+        or unconditionally with `force`, switching the broker offline.
+
+        :return: The message was spooled.
+        :rtype: bool
+        """
+        with self._spool_lock:
+            if not force and not self._offline.is_set():
+                return False
+
+            self.outbox.append(queue_name, body, properties, exchange=exchange)
+            self._offline.set()
+            return True
+
+    def _drain_outbox(self, batch_size: int = 500, max_backoff: float = 30.0) -> None:
+        """Outbox drainer thread. Waits until the broker goes offline,
+        reconnects with an exponential backoff and replays the outbox
+        in order with batched confirmed publications.
+
+        Description:
+            The outbox is replayed over a connection of the drainer,
+            as pika connections must not be used from several threads,
+            while the connection of the broker is used by publishers
+            and consumers. Publishers reconnect it themselves once
+            the outbox is empty.
+        """
+        attempt = 0
+        while True:
+            self._offline.wait()
+            if self._closing.is_set():
+                self._close_drainer_connection()
+                return
+
+            try:
+                drained = self._flush_outbox(batch_size=batch_size)
+
+            except AMQPError as e:
+                logger.info(f"Failed to replay the outbox: {e}")
+                self._close_drainer_connection()
+                drained = False
+
+            if not drained:
+                delay = min(0.5 * 2**attempt, max_backoff)
+                attempt += 1
+                self._closing.wait(delay)
+                continue
+
+            attempt = 0
+            with self._spool_lock:
+                if not len(self.outbox):
+                    self._offline.clear()
+                    logger.info("The outbox has been replayed, RabbitMQ is online.")
+
+    def _flush_outbox(self, batch_size: int) -> bool:
+        """Replays the outbox over the drainer connection.
+        Must be called from the drainer thread.
+
+        :return: The outbox was emptied without nacks.
+        :rtype: bool
+        """
+        if self._drainer_connection is None or self._drainer_connection.is_closed:
+            self._drainer_connection = BlockingConnection(self.params)
+            self._drainer_channel = None
+
+        if self._drainer_channel is None or self._drainer_channel.is_closed:
+            self._drainer_channel = self._drainer_confirms.open(
+                self._drainer_connection.channel()
+            )
+
+        channel = self._drainer_channel
+        while True:
+            spooled = self.outbox.peek(limit=batch_size)
+            if not spooled:
+                return True
+
+            # Consecutive messages to the same queue form one confirmed batch.
+            start = 0
+            while start < len(spooled):
+                _, queue_name, _, _, exchange = spooled[start]
+                end = start
+                while (
+                    end < len(spooled)
+                    and spooled[end][1] == queue_name
+                    and spooled[end][4] == exchange
+                ):
+                    end += 1
+
+                run = spooled[start:end]
+                self._declare_target(
+                    queue_name=queue_name, exchange=exchange, channel=channel
+                )
+                self._drainer_confirms.publish(
+                    connection=self._drainer_connection,
+                    channel=channel,
+                    messages=[(body, properties) for _, _, body, properties, _ in run],
+                    queue_name=queue_name,
+                    timeout=10.0,
+                    exchange=exchange,
+                )
+                confirmed, nacked = self._drainer_confirms.collect(count=len(run))
+                self.outbox.delete(run[index][0] for index in confirmed)
+                if nacked:
+                    return False
+
+                start = end
+
+    def _close_drainer_connection(self) -> None:
+        connection = self._drainer_connection
+        self._drainer_connection = None
+        self._drainer_channel = None
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+
+            except AMQPError:
+                pass
+
+    def _send(
+        self,
+        body: ByteString,
+        properties: Properties,
+        queue_name: str,
+        exchange: str = "",
+    ) -> None:
+        with self._channel_lock:
+            try:
+                self._publish(body, properties, queue_name, exchange)
+
+            except (ChannelClosed, ChannelWrongStateError) as e:
+                logger.info(f"Publishing channel is closed: {e}. Reopening...")
+                self._channel = None
+                self._publish(body, properties, queue_name, exchange)
+
+    def _publish(
+        self,
+        body: ByteString,
+        properties: Properties,
+        queue_name: str,
+        exchange: str = "",
+    ) -> None:
+        channel = self._get_publish_channel()
+        self._declare_target(queue_name=queue_name, exchange=exchange, channel=channel)
 
         channel.basic_publish(
-            exchange="",
+            exchange=exchange,
             routing_key=queue_name,
-            body=self._serialize(obj),
+            body=body,
+            properties=BasicProperties(**properties),
         )
-        logger.info(f"Object <{obj}> has been sent to the queue <{queue_name}>")
-        channel.close()
 
-    def listen(self, queue_name: str, td: float = 0.2) -> Any:
+    def publish_sharded(
+        self,
+        obj: Any,
+        queue_name: str,
+        shards: int,
+        key: Callable[[Any], Hashable] = peer_key,
+    ) -> None:
+        """Publishes a serialized object to one of the shard queues.
+
+        Description:
+            The shard is chosen by a jump consistent hash of the
+            object key, so all objects with the same key (by default,
+            events of the same chat) go to the same "<queue>.<shard>"
+            queue and keep their order, and changing the count of
+            shards moves only a small share of the keys.
+
+        :param Any obj: Object to be serialized and published.
+        :param str queue_name: Base name of the shard queues.
+        :param int shards: Count of shards.
+        :param Callable key: Function returning the key of an object. `Default: peer_key`.
+        """
+        shard = shard_for(key(obj), shards)
+        self.publish(obj=obj, queue_name=shard_queue_name(queue_name, shard))
+
+    def publish_many(
+        self, objs: Iterable[Any], queue_name: str, timeout: float = 10.0
+    ) -> PublishResult:
+        """Publishes a batch of serialized objects to a queue.
+
+        Description:
+            All objects are sent over one channel in publisher
+            confirms mode without waiting between publications.
+            The confirms are awaited once for the whole batch.
+            Objects that were not confirmed before the timeout
+            or before the channel was closed are reported as nacked.
+
+        :param Iterable[Any] objs: Objects to be serialized and published.
+        :param str queue_name: Name of the RabbitMQ queue to publish to.
+        :param float timeout: Time to wait for the confirms, in seconds. `Default: 10.0`.
+        :return: Confirmed and nacked objects.
+        :rtype: PublishResult
+        """
+        objs = list(objs)
+        messages = [self._serialize(obj) for obj in objs]
+
+        with self._channel_lock:
+            try:
+                channel = self._get_confirm_channel()
+                self._declare_queue(queue_name=queue_name, channel=channel)
+                self._confirms.publish(
+                    connection=self.connection,
+                    channel=channel,
+                    messages=messages,
+                    queue_name=queue_name,
+                    timeout=timeout,
+                )
+
+            except (ChannelClosed, ChannelWrongStateError) as e:
+                logger.info(f"Confirm channel is closed: {e}.")
+                self._confirm_channel = None
+
+            confirmed, nacked = self._confirms.collect(count=len(objs))
+
+        result = PublishResult(
+            confirmed=[objs[index] for index in confirmed],
+            nacked=[objs[index] for index in nacked],
+        )
+        logger.info(
+            f"{len(result.confirmed)} of {len(objs)} objects "
+            f"have been confirmed in the queue <{queue_name}>"
+        )
+        return result
+
+    def listen(
+        self,
+        queue_name: str,
+        td: Optional[float] = None,
+        *,
+        prefetch_count: int = 100,
+    ) -> Iterator[Any]:
         """Listens to messages on a specified RabbitMQ queue and deserializes them.
 
-        :param str queue_name: Name of the Redis channel to listen to.
-        :param float td: Delay between iterations of receiving messages. `Defaut: 0.2`.
-        :return: Deserialized object received from the channel.
-        :rtype: Any
+        Description:
+            Messages are pushed by RabbitMQ through `basic_consume`, up to
+            `prefetch_count` of them may be in flight at once. Each message
+            is acknowledged when the consumer asks for the next one, so a
+            message whose processing was interrupted is redelivered.
+            With a deduplicator set, messages whose event ID was
+            already handled are acknowledged and dropped before
+            deserialization. Messages that cannot be deserialized
+            are handled as failed ones with the quarantine enabled,
+            and rejected without requeueing otherwise.
+
+        :param str queue_name: Name of the RabbitMQ queue to listen to.
+        :param Optional[float] td: Deprecated and ignored, messages are
+            pushed by RabbitMQ instead of being polled.
+        :param int prefetch_count: Count of unacknowledged messages in flight. `Default: 100`.
+        :return: Deserialized object received from the queue.
+        :rtype: Iterator[Any]
         """
+        if td is not None:
+            warnings.warn(
+                "The `td` argument of `listen` is deprecated and ignored.",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+
         channel = self._get_channel()
         self._declare_queue(queue_name=queue_name, channel=channel)
+        channel.basic_qos(prefetch_count=prefetch_count)
 
         logger.info(f"Waiting for messages from the queue '{queue_name}'...")
-        while True:
-            method, properties, body = channel.basic_get(
-                queue=queue_name, auto_ack=True
-            )
-            if body is not None:
-                obj = self._deserialize(body)
+        try:
+            for method, properties, body in channel.consume(queue=queue_name):
+                key = self._dedup_key(queue_name, properties)
+                if self._is_duplicate(key):
+                    channel.basic_ack(delivery_tag=method.delivery_tag)
+                    continue
+
+                try:
+                    obj = self._deserialize(
+                        body, properties.content_type, properties.content_encoding
+                    )
+
+                except Exception as error:
+                    self._reject_undecodable(
+                        channel, queue_name, method, properties, body, error
+                    )
+                    continue
+
                 logger.info(f"Received <{obj}> from the queue '{queue_name}'.")
-                yield self._deserialize(body)
+                yield obj
+                channel.basic_ack(delivery_tag=method.delivery_tag)
+                self._remember(key)
+
+        finally:
+            if channel.is_open:
+                channel.close()
+
+    def listen_envelopes(
+        self, queue_name: str, prefetch_count: int = 100
+    ) -> Iterator[Envelope]:
+        """Listens to messages on a specified RabbitMQ queue
+        and yields them as lazily deserialized envelopes.
+
+        Description:
+            The same as `listen`, but the body is deserialized
+            only when the consumer accesses `Envelope.obj`. The
+            routing fields of events are available from the
+            envelope headers, so messages can be filtered or
+            discarded at almost no cost. Each message is
+            acknowledged when the consumer asks for the next one.
+
+        :param str queue_name: Name of the RabbitMQ queue to listen to.
+        :param int prefetch_count: Count of unacknowledged messages in flight. `Default: 100`.
+        :return: Envelope of the received message.
+        :rtype: Iterator[Envelope]
+        """
+        channel = self._get_channel()
+        self._declare_queue(queue_name=queue_name, channel=channel)
+        channel.basic_qos(prefetch_count=prefetch_count)
+
+        logger.info(f"Waiting for messages from the queue '{queue_name}'...")
+        try:
+            for method, properties, body in channel.consume(queue=queue_name):
+                key = self._dedup_key(queue_name, properties)
+                if self._is_duplicate(key):
+                    channel.basic_ack(delivery_tag=method.delivery_tag)
+                    continue
+
+                yield Envelope(
+                    body=body, properties=properties, deserialize=self._deserialize
+                )
+                channel.basic_ack(delivery_tag=method.delivery_tag)
+                self._remember(key)
+
+        finally:
+            if channel.is_open:
+                channel.close()
+
+    def listen_shards(
+        self, queue_name: str, shards: Iterable[int], prefetch_count: int = 100
+    ) -> Iterator[Any]:
+        """Listens to messages on the claimed shard queues
+        and deserializes them.
+
+        Description:
+            The same as `listen`, but consumes several
+            "<queue>.<shard>" queues over one channel. Messages
+            of each shard are yielded in their order.
+
+        :param str queue_name: Base name of the shard queues.
+        :param Iterable[int] shards: Claimed shard numbers (see `claim_shards`).
+        :param int prefetch_count: Count of unacknowledged messages in flight. `Default: 100`.
+        :return: Deserialized object received from the shard queues.
+        :rtype: Iterator[Any]
+        """
+        channel = self._get_channel()
+        channel.basic_qos(prefetch_count=prefetch_count)
+
+        deliveries = deque()
+
+        def on_message(_channel, method, properties, body) -> None:
+            deliveries.append((method, properties, body))
+
+        shard_names = [shard_queue_name(queue_name, shard) for shard in shards]
+        for shard_name in shard_names:
+            self._declare_queue(queue_name=shard_name, channel=channel)
+            channel.basic_consume(queue=shard_name, on_message_callback=on_message)
+
+        logger.info(f"Waiting for messages from the queues {shard_names}...")
+        try:
+            while True:
+                if not deliveries:
+                    self.connection.process_data_events(time_limit=None)
+                    continue
+
+                method, properties, body = deliveries.popleft()
+                # Shards are published to through the default exchange,
+                # so the routing key is the shard queue name.
+                key = self._dedup_key(method.routing_key, properties)
+                if self._is_duplicate(key):
+                    channel.basic_ack(delivery_tag=method.delivery_tag)
+                    continue
+
+                try:
+                    obj = self._deserialize(
+                        body, properties.content_type, properties.content_encoding
+                    )
+
+                except Exception as error:
+                    self._reject_undecodable(
+                        channel, method.routing_key, method, properties, body, error
+                    )
+                    continue
+
+                logger.info(f"Received <{obj}> from the queue '{method.routing_key}'.")
+                yield obj
+                channel.basic_ack(delivery_tag=method.delivery_tag)
+                self._remember(key)
+
+        finally:
+            if channel.is_open:
+                channel.close()
+
+    def listen_acked(
+        self,
+        queue_name: str,
+        prefetch_count: int = 100,
+        ack_every: int = 50,
+        ack_interval_ms: int = 200,
+    ) -> Iterator[Delivery]:
+        """Listens to messages on a specified RabbitMQ queue in
+        manual acknowledgement mode and yields their handles.
+
+        Description:
+            A handled delivery is not acknowledged right away.
+            Acks are accumulated and sent as a single
+            `multiple=True` ack once `ack_every` deliveries are
+            pending or `ack_interval_ms` have passed, so a crash
+            redelivers at most the unacknowledged tail. The
+            consumer may nack or requeue a delivery through
+            its handle, or report a handler error with `fail`.
+            Messages that cannot be deserialized are not yielded,
+            and are settled as by `listen`.
+
+        :param str queue_name: Name of the RabbitMQ queue to listen to.
+        :param int prefetch_count: Count of unacknowledged messages in flight. `Default: 100`.
+        :param int ack_every: Count of pending deliveries flushing the acks. `Default: 50`.
+        :param int ack_interval_ms: Maximum age of a pending ack, in milliseconds. `Default: 200`.
+        :return: Handle of the received message.
+        :rtype: Iterator[Delivery]
+        """
+        channel = self._get_channel()
+        self._declare_queue(queue_name=queue_name, channel=channel)
+        channel.basic_qos(prefetch_count=prefetch_count)
+
+        ack_interval = ack_interval_ms / 1000
+        on_failure = None
+        if self.quarantine:
+            on_failure = partial(self._fail_delivery, queue_name)
+        pending_tag, pending_count, pending_since = 0, 0, 0.0
+
+        logger.info(f"Waiting for messages from the queue '{queue_name}'...")
+        try:
+            for method, properties, body in channel.consume(
+                queue=queue_name, inactivity_timeout=ack_interval
+            ):
+                handled = False
+                if method is not None:
+                    key = self._dedup_key(queue_name, properties)
+                    handled = self._is_duplicate(key)
+
+                if method is not None and not handled:
+                    try:
+                        obj = self._deserialize(
+                            body, properties.content_type, properties.content_encoding
+                        )
+
+                    except Exception as error:
+                        self._reject_undecodable(
+                            channel, queue_name, method, properties, body, error
+                        )
+                        continue
+
+                    delivery = Delivery(
+                        obj=obj,
+                        delivery_tag=method.delivery_tag,
+                        redelivered=method.redelivered,
+                        body=body,
+                        properties=properties,
+                        channel=channel,
+                        on_failure=on_failure,
+                    )
+                    logger.info(
+                        f"Received <{delivery.obj}> from the queue '{queue_name}'."
+                    )
+                    yield delivery
+
+                    handled = not delivery.settled
+                    if (handled or delivery.acked) and not delivery.failed:
+                        self._remember(key)
+
+                if handled:
+                    if not pending_count:
+                        pending_since = time.monotonic()
+                    pending_tag = method.delivery_tag
+                    pending_count += 1
+
+                if pending_count and (
+                    pending_count >= ack_every
+                    or time.monotonic() - pending_since >= ack_interval
+                ):
+                    channel.basic_ack(delivery_tag=pending_tag, multiple=True)
+                    pending_count = 0
+
+        finally:
+            if channel.is_open:
+                if pending_count:
+                    channel.basic_ack(delivery_tag=pending_tag, multiple=True)
+                channel.close()
+
+    def _fail_delivery(
+        self, queue_name: str, delivery: Delivery, error: BaseException
+    ) -> None:
+        self._fail_message(
+            queue_name=queue_name,
+            body=delivery.body,
+            properties=delivery.properties,
+            error=error,
+        )
+        delivery.ack()
+
+    def _reject_undecodable(
+        self,
+        channel: BlockingChannel,
+        queue_name: str,
+        method: spec.Basic.Deliver,
+        properties: BasicProperties,
+        body: ByteString,
+        error: BaseException,
+    ) -> None:
+        """Settles a message that cannot be deserialized, e.g. a corrupt
+        body or an unknown content type, so it is not redelivered forever.
+        With the quarantine enabled, it is handled as a failed message,
+        otherwise it is rejected without requeueing.
+        """
+        logger.error(f"Failed to deserialize a message from '{queue_name}': {error}")
+        if self.quarantine:
+            self._fail_message(
+                queue_name=queue_name, body=body, properties=properties, error=error
+            )
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+        else:
+            channel.basic_reject(delivery_tag=method.delivery_tag, requeue=False)
+
+    def _fail_message(
+        self,
+        queue_name: str,
+        body: ByteString,
+        properties: BasicProperties,
+        error: BaseException,
+    ) -> None:
+        """Republishes a message the handler failed on to the tail
+        of its queue, or to the quarantine queue once it has failed
+        `max_failures` times. The caller acks the original message.
+        """
+        target, headers = self._failure_route(queue_name, properties.headers, error)
+        if target != queue_name:
+            logger.error(
+                f"Message from the queue '{queue_name}' failed "
+                f"{headers[FAILURES_HEADER]} times and was moved to '{target}': {error}"
+            )
+
+        self._send(
+            body=body,
+            properties=self._copy_properties(properties, headers),
+            queue_name=target,
+        )
+
+    @staticmethod
+    def _copy_properties(
+        properties: BasicProperties, headers: Dict[str, Any]
+    ) -> Properties:
+        """Copies the AMQP properties of a received message to
+        republish it with new headers. The message ID is kept,
+        so the republished message is still deduplicated.
+        """
+        copied = {name: getattr(properties, name) for name in MESSAGE_PROPERTIES}
+        copied["headers"] = headers
+        return copied
+
+    def replay_quarantine(self, queue_name: str, limit: Optional[int] = None) -> int:
+        """Moves messages from the quarantine queue back to the queue,
+        resetting their failure counters.
+
+        :param str queue_name: Name of the queue whose quarantine is replayed.
+        :param Optional[int] limit: Maximum count of messages to move. `Default: all`.
+        :return: Count of moved messages.
+        :rtype: int
+        """
+        quarantine_name = queue_name + QUARANTINE_SUFFIX
+        channel = self._get_channel()
+        self._declare_queue(queue_name=queue_name, channel=channel)
+        self._declare_queue(queue_name=quarantine_name, channel=channel)
+
+        moved = 0
+        try:
+            while limit is None or moved < limit:
+                method, properties, body = channel.basic_get(queue=quarantine_name)
+                if method is None:
+                    break
+
+                headers = dict(properties.headers or {})
+                headers.pop(FAILURES_HEADER, None)
+                headers.pop(ERROR_HEADER, None)
+                self._send(
+                    body=body,
+                    properties=self._copy_properties(properties, headers),
+                    queue_name=queue_name,
+                )
+                channel.basic_ack(delivery_tag=method.delivery_tag)
+                moved += 1
+
+        finally:
+            if channel.is_open:
+                channel.close()
+
+        logger.info(f"{moved} messages have been replayed from '{quarantine_name}'.")
+        return moved
+
+    def listen_batch(
+        self,
+        queue_name: str,
+        max_items: int = 100,
+        max_wait_ms: int = 500,
+        prefetch_count: Optional[int] = None,
+    ) -> Iterator[List[Any]]:
+        """Listens to messages on a specified RabbitMQ queue and
+        yields them deserialized in batches.
+
+        Description:
+            A batch is released as soon as it holds `max_items`
+            objects or `max_wait_ms` have passed since its first
+            message arrived. The whole batch is acknowledged with
+            a single `multiple=True` ack when the consumer asks
+            for the next one, so a batch whose processing was
+            interrupted is redelivered. Messages that cannot be
+            deserialized are left out of the batch, and are
+            settled as by `listen`.
+
+        :param str queue_name: Name of the RabbitMQ queue to listen to.
+        :param int max_items: Maximum count of objects in a batch. `Default: 100`.
+        :param int max_wait_ms: Maximum time to fill a batch, in milliseconds. `Default: 500`.
+        :param Optional[int] prefetch_count: Count of unacknowledged messages in flight. `Default: max_items`.
+        :return: Batch of deserialized objects received from the queue.
+        :rtype: Iterator[List[Any]]
+        """
+        channel = self._get_channel()
+        self._declare_queue(queue_name=queue_name, channel=channel)
+        channel.basic_qos(prefetch_count=max(prefetch_count or 0, max_items))
+
+        deliveries = deque()
+
+        def on_message(_channel, method, properties, body) -> None:
+            deliveries.append((method, properties, body))
 
+        channel.basic_consume(queue=queue_name, on_message_callback=on_message)
+
+        logger.info(f"Waiting for messages from the queue '{queue_name}'...")
+        try:
+            while True:
+                batch, keys = [], []
+                while len(batch) < max_items:
+                    if deliveries:
+                        method, properties, body = deliveries.popleft()
+                        key = self._dedup_key(queue_name, properties)
+                        if self._is_duplicate(key):
+                            # Acked at once, so a window full of duplicates
+                            # does not stop the deliveries.
+                            channel.basic_ack(delivery_tag=method.delivery_tag)
+                            continue
+
+                        try:
+                            obj = self._deserialize(
+                                body,
+                                properties.content_type,
+                                properties.content_encoding,
+                            )
+
+                        except Exception as error:
+                            self._reject_undecodable(
+                                channel, queue_name, method, properties, body, error
+                            )
+                            continue
+
+                        delivery_tag = method.delivery_tag
+                        keys.append(key)
+                        if not batch:
+                            deadline = time.monotonic() + max_wait_ms / 1000
+
+                        batch.append(obj)
+                        continue
+
+                    if not batch:
+                        self.connection.process_data_events(time_limit=None)
+                        continue
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+
+                    self.connection.process_data_events(time_limit=remaining)
+
+                logger.info(
+                    f"Received a batch of {len(batch)} objects "
+                    f"from the queue '{queue_name}'."
+                )
+                yield batch
+                channel.basic_ack(delivery_tag=delivery_tag, multiple=True)
+                for key in keys:
+                    self._remember(key)
+
+        finally:
+            if channel.is_open:
+                channel.close()
+
+
+class AsyncBroker(BaseBroker):
+    """RabbitMQ async broker class."""
+
+    def __init__(
+        self,
+        creds: RabbitMQCredentials,
+        codec: str = "dill",
+        compression: Optional[str] = None,
+        compression_threshold: int = 1024,
+        quarantine: bool = False,
+        max_failures: int = 3,
+    ) -> None:
+        super().__init__(
+            creds=creds,
+            codec=codec,
+            compression=compression,
+            compression_threshold=compression_threshold,
+            quarantine=quarantine,
+            max_failures=max_failures,
+        )
+        self.connection: Optional[AbstractRobustConnection] = None
+        self._channel: Optional[AbstractRobustChannel] = None
+        self._confirm_channel: Optional[AbstractRobustChannel] = None
+        self._connection_lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        """Opens a connection to RabbitMQ.
+
+        Description:
+            It is called implicitly by the first publication
+            or listening. The connection is restored automatically
+            after network failures.
+        """
+        async with self._connection_lock:
+            if self.connection is None or self.connection.is_closed:
+                self.connection = await connect_robust(
+                    host=self.creds.host,
+                    port=self.creds.port,
+                    virtualhost=self.creds.vhost,
+                    login=self.creds.user,
+                    password=self.creds.pswd,
+                )
+                self._channel = None
+                self._confirm_channel = None
+                self._declared_queues.clear()
+                self._declared_exchanges.clear()
+
+    async def close(self) -> None:
+        """Closes the connection to RabbitMQ."""
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+    async def _get_channel(
+        self, publisher_confirms: bool = False
+    ) -> AbstractRobustChannel:
+        await self.connect()
+        return await self.connection.channel(publisher_confirms=publisher_confirms)
+
+    async def _get_publish_channel(self) -> AbstractRobustChannel:
+        if self._channel is None or self._channel.is_closed:
+            self._channel = await self._get_channel()
+
+        return self._channel
+
+    async def _get_confirm_channel(self) -> AbstractRobustChannel:
+        if self._confirm_channel is None or self._confirm_channel.is_closed:
+            self._confirm_channel = await self._get_channel(publisher_confirms=True)
+
+        return self._confirm_channel
+
+    async def _declare_queue(
+        self, queue_name: str, channel: AbstractRobustChannel
+    ) -> None:
+        if queue_name in self._declared_queues:
+            return
+
+        arguments = self._queue_arguments(queue_name)
+        if arguments is not None:
+            await self._declare_queue(arguments["x-dead-letter-routing-key"], channel)
+
+        await channel.declare_queue(name=queue_name, durable=True, arguments=arguments)
+        self._declared_queues.add(queue_name)
+
+    async def _declare_exchange(
+        self, exchange: str, channel: AbstractRobustChannel
+    ) -> AbstractExchange:
+        if exchange not in self._declared_exchanges:
+            await channel.declare_exchange(
+                name=exchange,
+                type=self._exchange_types.get(exchange, "topic"),
+                durable=True,
+            )
+            self._declared_exchanges.add(exchange)
+
+        return await channel.get_exchange(name=exchange, ensure=False)
+
+    async def declare_exchange(
+        self, exchange: str, exchange_type: str = "topic"
+    ) -> None:
+        """Declares a durable exchange.
+
+        :param str exchange: Name of the exchange.
+        :param str exchange_type: Type of the exchange, `topic` or `fanout`. `Default: topic`.
+        """
+        self._exchange_types[exchange] = exchange_type
+        await self._declare_exchange(exchange, await self._get_publish_channel())
+
+    async def bind_queue(
+        self,
+        queue_name: str,
+        exchange: str,
+        routing_key: str = "#",
+        exchange_type: str = "topic",
+    ) -> None:
+        """Declares a queue and binds it to an exchange.
+
+        :param str queue_name: Name of the queue.
+        :param str exchange: Name of the exchange.
+        :param str routing_key: Binding pattern, e.g. `vk.message.*`, ignored by fanout exchanges. `Default: #`.
+        :param str exchange_type: Type of the exchange, `topic` or `fanout`. `Default: topic`.
+        """
+        self._exchange_types.setdefault(exchange, exchange_type)
+        channel = await self._get_publish_channel()
+        exchange_obj = await self._declare_exchange(exchange, channel)
+        await self._declare_queue(queue_name=queue_name, channel=channel)
+        queue = await channel.get_queue(name=queue_name, ensure=False)
+        await queue.bind(exchange_obj, routing_key=routing_key)
+
+    async def publish(
+        self, obj: Any, queue_name: str, delay: Optional[float] = None
+    ) -> None:
+        """Publishes a serialized object to a queue.
+
+        Description:
+            A delayed object is held in a RabbitMQ delay queue,
+            the same way as by `Broker.publish`.
+
+        :param Any obj: Object to be serialized and published.
+        :param str queue_name: Name of the RabbitMQ queue to publish to.
+        :param Optional[float] delay: Time to hold the object back, in seconds. `Default: None`.
+        """
+        body, properties = self._serialize(obj)
+        if delay is not None and delay > 0:
+            queue_name = self._delay_queue(queue_name, delay)
+
+        channel = await self._get_publish_channel()
+        await self._declare_queue(queue_name=queue_name, channel=channel)
+
+        await channel.default_exchange.publish(
+            Message(body=body, **properties),
+            routing_key=queue_name,
+        )
+        logger.info(f"Object <{obj}> has been sent to the queue <{queue_name}>")
+
+    async def publish_to_exchange(
+        self, obj: Any, exchange: str, routing_key: Optional[str] = None
+    ) -> None:
+        """Publishes a serialized object to an exchange.
+
+        Description:
+            The same as `Broker.publish_to_exchange`.
+
+        :param Any obj: Object to be serialized and published.
+        :param str exchange: Name of the exchange to publish to.
+        :param Optional[str] routing_key: Routing key of the object. `Default: None`.
+        """
+        if routing_key is None:
+            routing_key = default_routing_key(obj)
+
+        body, properties = self._serialize(obj)
+        channel = await self._get_publish_channel()
+        exchange_obj = await self._declare_exchange(exchange, channel)
+
+        await exchange_obj.publish(
+            Message(body=body, **properties),
+            routing_key=routing_key,
+        )
+        logger.info(
+            f"Object <{obj}> has been sent to the exchange "
+            f"<{exchange}> with the key <{routing_key}>"
+        )
+
+    async def publish_many(
+        self, objs: Iterable[Any], queue_name: str, timeout: float = 10.0
+    ) -> PublishResult:
+        """Publishes a batch of serialized objects to a queue.
+
+        Description:
+            All objects are sent over one channel in publisher
+            confirms mode, the confirms are awaited concurrently.
+            Objects that were not confirmed before the timeout
+            are reported as nacked.
+
+        :param Iterable[Any] objs: Objects to be serialized and published.
+        :param str queue_name: Name of the RabbitMQ queue to publish to.
+        :param float timeout: Time to wait for the confirms, in seconds. `Default: 10.0`.
+        :return: Confirmed and nacked objects.
+        :rtype: PublishResult
+        """
+        objs = list(objs)
+        messages = [self._serialize(obj) for obj in objs]
+        channel = await self._get_confirm_channel()
+        await self._declare_queue(queue_name=queue_name, channel=channel)
+
+        outcomes = await asyncio.gather(
+            *(
+                channel.default_exchange.publish(
+                    Message(body=body, **properties),
+                    routing_key=queue_name,
+                    timeout=timeout,
+                )
+                for body, properties in messages
+            ),
+            return_exceptions=True,
+        )
+
+        result = PublishResult(confirmed=[], nacked=[])
+        for obj, outcome in zip(objs, outcomes):
+            if isinstance(outcome, BaseException):
+                result.nacked.append(obj)
             else:
-                time.sleep(td)
+                result.confirmed.append(obj)
+
+        logger.info(
+            f"{len(result.confirmed)} of {len(objs)} objects "
+            f"have been confirmed in the queue <{queue_name}>"
+        )
+        return result
+
+    async def listen(
+        self, queue_name: str, prefetch_count: int = 100
+    ) -> AsyncIterator[Any]:
+        """Listens to messages on a specified RabbitMQ queue and deserializes them.
+
+        Description:
+            The same as `Broker.listen`, but iterated with `async for`.
+
+        :param str queue_name: Name of the RabbitMQ queue to listen to.
+        :param int prefetch_count: Count of unacknowledged messages in flight. `Default: 100`.
+        :return: Deserialized object received from the queue.
+        :rtype: AsyncIterator[Any]
+        """
+        channel = await self._get_channel()
+        await channel.set_qos(prefetch_count=prefetch_count)
+        await self._declare_queue(queue_name=queue_name, channel=channel)
+        queue = await channel.get_queue(name=queue_name)
+
+        logger.info(f"Waiting for messages from the queue '{queue_name}'...")
+        try:
+            async with queue.iterator() as queue_iter:
+                async for message in queue_iter:
+                    obj = self._deserialize(
+                        message.body, message.content_type, message.content_encoding
+                    )
+                    logger.info(f"Received <{obj}> from the queue '{queue_name}'.")
+                    yield obj
+                    await message.ack()
 
-        channel.close()
+        finally:
+            if not channel.is_closed:
+                await channel.close()
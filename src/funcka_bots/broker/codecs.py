@@ -0,0 +1,226 @@
+"""Module "broker".
+
+File:
+    codecs.py
+
+About:
+    File describing the serialization codecs used
+    by the brokers and the registry they are looked
+    up in by name or by AMQP content type.
+"""
+
+import json
+import pickle
+from abc import ABC, abstractmethod
+from typing import Any, ByteString, Dict, Optional
+import dill
+from funcka_bots.events.events import BaseEvent
+from funcka_bots.events.interning import intern_field
+from funcka_bots.events.schema import (
+    EVENT_SCHEMAS,
+    schema_of,
+    flatten_object,
+    restore_object,
+)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class Codec(ABC):
+    """Abstract serialization codec.
+
+    Attributes:
+        name (str): Short codec name used in the broker configuration.
+        content_type (str): AMQP content type marking the encoded messages.
+    """
+
+    name: str
+    content_type: str
+
+    @abstractmethod
+    def encode(self, obj: Any) -> ByteString:
+        """Serializes an object to bytes."""
+
+    @abstractmethod
+    def decode(self, data: ByteString) -> Any:
+        """Deserializes an object from bytes."""
+
+
+class DillCodec(Codec):
+    """Codec based on dill. Handles any object, but
+    executes arbitrary code on load.
+    """
+
+    name = "dill"
+    content_type = "application/x-dill"
+
+    def encode(self, obj: Any) -> ByteString:
+        return dill.dumps(obj=obj, protocol=dill.HIGHEST_PROTOCOL)
+
+    def decode(self, data: ByteString) -> Any:
+        return dill.loads(str=data)
+
+
+class PickleCodec(Codec):
+    """Codec based on the standard pickle. Handles
+    importable classes only, but is much faster than dill.
+    """
+
+    name = "pickle"
+    content_type = "application/x-pickle"
+
+    def encode(self, obj: Any) -> ByteString:
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, data: ByteString) -> Any:
+        return pickle.loads(data)
+
+
+class JsonCodec(Codec):
+    """Codec based on JSON. Handles plain data only."""
+
+    name = "json"
+    content_type = "application/json"
+
+    def encode(self, obj: Any) -> ByteString:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def decode(self, data: ByteString) -> Any:
+        return json.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """Codec based on MessagePack. Handles plain data only.
+    Requires the optional `msgpack` package.
+    """
+
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    def encode(self, obj: Any) -> ByteString:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def decode(self, data: ByteString) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class EventCodec(Codec):
+    """Schema-aware codec for VkEvent and Punishment.
+
+    Description:
+        The event is flattened into nested lists in the field
+        order of the schema, without attribute names and class
+        paths, and then packed by the underlying plain data codec.
+        Objects of other types are rejected with TypeError.
+    """
+
+    def __init__(self, packer: Codec) -> None:
+        self.packer = packer
+        self.name = f"event+{packer.name}"
+        self.content_type = f"application/x-funcka-event+{packer.name}"
+        self._classes = {schema.tag: cls for cls, schema in EVENT_SCHEMAS.items()}
+
+    def encode(self, obj: Any) -> ByteString:
+        schema = schema_of(type(obj))
+        if schema is None:
+            raise TypeError(f"Object <{obj}> is not supported by the event codec.")
+
+        row = [schema.tag]
+        row.extend(getattr(obj, attr) for attr in schema.scalars)
+        row.extend(flatten_object(getattr(obj, attr, None)) for attr in schema.objects)
+        return self.packer.encode(row)
+
+    def decode(self, data: ByteString) -> Any:
+        row = self.packer.decode(data)
+        cls = self._classes[row[0]]
+        _, _, scalars, objects = EVENT_SCHEMAS[cls]
+
+        event = cls(*row[1 : len(scalars) + 1])
+        for attr, value in zip(objects, row[len(scalars) + 1 :]):
+            if value is not None:
+                event.add_object(
+                    name=attr, value=intern_field(attr, restore_object(attr, value))
+                )
+
+        return event
+
+
+class WireCodec(Codec):
+    """Codec based on the binary wire format of the events.
+    Handles VkEvent and Punishment only. Decoded events keep
+    the message body and decode their objects on access.
+    """
+
+    name = "wire"
+    content_type = "application/x-funcka-wire"
+
+    def encode(self, obj: Any) -> ByteString:
+        if not isinstance(obj, BaseEvent):
+            raise TypeError(f"Object <{obj}> is not supported by the wire codec.")
+
+        return obj.to_bytes()
+
+    def decode(self, data: ByteString) -> Any:
+        return BaseEvent.from_bytes(data)
+
+
+_CODECS_BY_NAME: Dict[str, Codec] = {}
+_CODECS_BY_CONTENT_TYPE: Dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec) -> None:
+    """Registers a codec under its name and content type.
+
+    :param Codec codec: Codec instance.
+    """
+    _CODECS_BY_NAME[codec.name] = codec
+    _CODECS_BY_CONTENT_TYPE[codec.content_type] = codec
+
+
+def get_codec(name: str) -> Codec:
+    """Returns a registered codec by its name.
+
+    :param str name: Codec name (e.g., `dill`, `event+msgpack`).
+    :raises KeyError: The codec is not registered.
+    :rtype: Codec
+    """
+    try:
+        return _CODECS_BY_NAME[name]
+
+    except KeyError:
+        raise KeyError(f"Codec <{name}> is not registered.") from None
+
+
+def get_codec_by_content_type(content_type: Optional[str]) -> Codec:
+    """Returns a registered codec by the AMQP content type.
+
+    Description:
+        Messages without a content type are published by
+        older versions of the package and are decoded with dill.
+
+    :param Optional[str] content_type: AMQP content type of the message.
+    :raises KeyError: The codec is not registered.
+    :rtype: Codec
+    """
+    if content_type is None:
+        return _CODECS_BY_NAME[DillCodec.name]
+
+    try:
+        return _CODECS_BY_CONTENT_TYPE[content_type]
+
+    except KeyError:
+        raise KeyError(f"No codec for the content type <{content_type}>.") from None
+
+
+register_codec(DillCodec())
+register_codec(PickleCodec())
+register_codec(JsonCodec())
+register_codec(EventCodec(packer=JsonCodec()))
+register_codec(WireCodec())
+
+if msgpack is not None:
+    register_codec(MsgpackCodec())
+    register_codec(EventCodec(packer=MsgpackCodec()))
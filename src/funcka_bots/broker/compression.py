@@ -0,0 +1,136 @@
+"""Module "broker".
+
+File:
+    compression.py
+
+About:
+    File describing the payload compressors used
+    by the brokers and the registry they are looked
+    up in by the AMQP content encoding.
+"""
+
+import zlib
+import threading
+from abc import ABC, abstractmethod
+from typing import ByteString, Dict
+
+try:
+    import lz4.frame as lz4
+except ImportError:
+    lz4 = None
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+
+class Compressor(ABC):
+    """Abstract payload compressor.
+
+    Attributes:
+        name (str): Compressor name, sent as the AMQP content encoding.
+    """
+
+    name: str
+
+    @abstractmethod
+    def compress(self, data: ByteString) -> ByteString:
+        """Compresses a message body."""
+
+    @abstractmethod
+    def decompress(self, data: ByteString) -> ByteString:
+        """Decompresses a message body."""
+
+
+class ZlibCompressor(Compressor):
+    """Compressor based on the standard zlib."""
+
+    name = "zlib"
+
+    def __init__(self, level: int = 6) -> None:
+        self.level = level
+
+    def compress(self, data: ByteString) -> ByteString:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: ByteString) -> ByteString:
+        return zlib.decompress(data)
+
+
+class Lz4Compressor(Compressor):
+    """Compressor based on LZ4 frames.
+    Requires the optional `lz4` package.
+    """
+
+    name = "lz4"
+
+    def compress(self, data: ByteString) -> ByteString:
+        return lz4.compress(data)
+
+    def decompress(self, data: ByteString) -> ByteString:
+        return lz4.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    """Compressor based on Zstandard.
+    Requires the optional `zstandard` package.
+
+    The Zstandard contexts are not safe to use from several
+    threads at once, so each thread gets contexts of its own.
+    """
+
+    name = "zstd"
+
+    def __init__(self, level: int = 3) -> None:
+        self.level = level
+        self._local = threading.local()
+
+    def compress(self, data: ByteString) -> ByteString:
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstd.ZstdCompressor(level=self.level)
+
+        return compressor.compress(data)
+
+    def decompress(self, data: ByteString) -> ByteString:
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = zstd.ZstdDecompressor()
+
+        return decompressor.decompress(data)
+
+
+_COMPRESSORS: Dict[str, Compressor] = {}
+
+
+def register_compressor(compressor: Compressor) -> None:
+    """Registers a compressor under its name.
+
+    :param Compressor compressor: Compressor instance.
+    """
+    _COMPRESSORS[compressor.name] = compressor
+
+
+def get_compressor(name: str) -> Compressor:
+    """Returns a registered compressor by its name,
+    which is also the AMQP content encoding.
+
+    :param str name: Compressor name (e.g., `zlib`, `zstd`).
+    :raises KeyError: The compressor is not registered.
+    :rtype: Compressor
+    """
+    try:
+        return _COMPRESSORS[name]
+
+    except KeyError:
+        raise KeyError(f"Compressor <{name}> is not registered.") from None
+
+
+register_compressor(ZlibCompressor())
+
+if lz4 is not None:
+    register_compressor(Lz4Compressor())
+
+if zstd is not None:
+    register_compressor(ZstdCompressor())
@@ -0,0 +1,122 @@
+"""Module "broker".
+
+File:
+    confirms.py
+
+About:
+    File describing the ConfirmTracker class, which
+    follows the publisher confirms of a channel.
+"""
+
+import time
+from typing import ByteString, Dict, List, Tuple
+from pika import BasicProperties, BlockingConnection, spec
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.frame import Method
+from .base import Properties
+
+
+class ConfirmTracker:
+    """Publisher confirms of a channel in confirms mode.
+
+    Description:
+        BlockingChannel.confirm_delivery waits for a confirm after
+        every publication, so the confirms mode is enabled on the
+        underlying channel, and the confirms of a whole batch are
+        awaited at once. A tracker, like its channel, must be
+        used from one thread at a time.
+    """
+
+    def __init__(self) -> None:
+        self._delivery_tag = 0
+        self._pending: Dict[int, int] = {}
+        self._confirmed: List[int] = []
+
+    def open(self, channel: BlockingChannel) -> BlockingChannel:
+        """Switches a new channel to the confirms mode.
+
+        :param BlockingChannel channel: Channel without publications yet.
+        :return: The channel.
+        :rtype: BlockingChannel
+        """
+        selected = []
+        channel._impl.confirm_delivery(
+            ack_nack_callback=self._on_confirmation,
+            callback=selected.append,
+        )
+        channel._flush_output(lambda: bool(selected))
+
+        self._delivery_tag = 0
+        return channel
+
+    def _on_confirmation(self, frame: Method) -> None:
+        method = frame.method
+        if method.multiple:
+            tags = [tag for tag in self._pending if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+
+        for tag in tags:
+            index = self._pending.pop(tag, None)
+            if index is not None and isinstance(method, spec.Basic.Ack):
+                self._confirmed.append(index)
+
+    def publish(
+        self,
+        connection: BlockingConnection,
+        channel: BlockingChannel,
+        messages: List[Tuple[ByteString, Properties]],
+        queue_name: str,
+        timeout: float,
+        exchange: str = "",
+    ) -> None:
+        """Publishes messages without waiting between them, and
+        waits for their confirms until the timeout passes.
+
+        :param BlockingConnection connection: Connection of the channel.
+        :param BlockingChannel channel: Channel opened with `open`.
+        :param List[Tuple[ByteString, Properties]] messages: Bodies and properties.
+        :param str queue_name: Routing key of the messages.
+        :param float timeout: Time to wait for the confirms, in seconds.
+        :param str exchange: Name of the exchange. `Default: the default exchange`.
+        """
+        self._pending.clear()
+        self._confirmed.clear()
+
+        for index, (body, properties) in enumerate(messages):
+            self._delivery_tag += 1
+            self._pending[self._delivery_tag] = index
+            channel._impl.basic_publish(
+                exchange=exchange,
+                routing_key=queue_name,
+                body=body,
+                properties=BasicProperties(**properties),
+            )
+
+        # The timer only wakes the I/O loop up when the deadline passes.
+        deadline = time.monotonic() + timeout
+        timer_id = connection.call_later(timeout, lambda: None)
+        try:
+            channel._flush_output(
+                lambda: not self._pending,
+                lambda: time.monotonic() >= deadline,
+            )
+
+        finally:
+            connection.remove_timeout(timer_id)
+
+    def collect(self, count: int) -> Tuple[List[int], List[int]]:
+        """Returns the indices of the confirmed and the nacked messages
+        of the last publication, and forgets them. Messages that were
+        not confirmed before the timeout are reported as nacked.
+
+        :param int count: Count of the published messages.
+        :rtype: Tuple[List[int], List[int]]
+        """
+        confirmed = sorted(self._confirmed)
+        settled = set(confirmed)
+        nacked = [index for index in range(count) if index not in settled]
+
+        self._pending.clear()
+        self._confirmed.clear()
+        return confirmed, nacked
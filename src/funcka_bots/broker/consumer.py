@@ -0,0 +1,180 @@
+"""Module "broker".
+
+File:
+    consumer.py
+
+About:
+    File describing the ConsumerPool class, which
+    dispatches messages of a queue to a pool of
+    workers while keeping the order of the messages
+    sharing the same key.
+"""
+
+from functools import partial
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Hashable, List, Optional
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.spec import Basic, BasicProperties
+from loguru import logger
+from .broker import Broker
+from .sharding import peer_key
+
+
+class ConsumerPool:
+    """Concurrent queue consumer.
+
+    Description:
+        Messages are distributed over `workers` lanes by
+        the hash of their key. Each lane runs one handler
+        call at a time, so messages with the same key are
+        handled in order, while different keys are handled
+        in parallel. A message is acknowledged only after
+        its handler has finished. A failed message is passed
+        to the broker quarantine, if it is enabled, otherwise
+        it is rejected without requeueing. The count of messages
+        in flight is bounded by the prefetch window.
+    """
+
+    def __init__(
+        self,
+        broker: Broker,
+        queue_name: str,
+        handler: Callable[[Any], Any],
+        workers: int = 8,
+        prefetch_count: Optional[int] = None,
+        key: Callable[[Any], Hashable] = peer_key,
+        use_processes: bool = False,
+    ) -> None:
+        """
+        :param Broker broker: Broker whose connection is used.
+        :param str queue_name: Name of the RabbitMQ queue to consume.
+        :param Callable handler: Handler called with each deserialized object.
+        :param int workers: Count of lanes. `Default: 8`.
+        :param Optional[int] prefetch_count: Count of messages in flight. `Default: workers * 4`.
+        :param Callable key: Function returning the ordering key of an object. `Default: peer_key`.
+        :param bool use_processes: Run lanes in processes, the handler must be picklable. `Default: False`.
+        """
+        self.broker = broker
+        self.queue_name = queue_name
+        self.handler = handler
+        self.key = key
+        self.prefetch_count = prefetch_count or workers * 4
+        self._executor_class = (
+            ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        )
+        self._workers = workers
+        self._lanes: List[Executor] = []
+        self._channel: Optional[BlockingChannel] = None
+
+    def run(self) -> None:
+        """Consumes the queue until `stop` is called.
+        Blocks the calling thread, which must be the thread
+        the broker connection is used from.
+        """
+        self._lanes = [
+            self._executor_class(max_workers=1) for _ in range(self._workers)
+        ]
+        self._channel = channel = self.broker._get_channel()
+        self.broker._declare_queue(queue_name=self.queue_name, channel=channel)
+        channel.basic_qos(prefetch_count=self.prefetch_count)
+        channel.basic_consume(
+            queue=self.queue_name, on_message_callback=self._on_message
+        )
+
+        logger.info(
+            f"Consuming the queue '{self.queue_name}' with {self._workers} workers..."
+        )
+        try:
+            channel.start_consuming()
+
+        finally:
+            for lane in self._lanes:
+                lane.shutdown(wait=True)
+
+            # Sends the acknowledgements of the handlers finished during shutdown.
+            self.broker.connection.process_data_events(time_limit=0)
+            if channel.is_open:
+                channel.close()
+
+    def stop(self) -> None:
+        """Stops consuming. Can be called from any thread."""
+        if self._channel is not None:
+            self.broker.connection.add_callback_threadsafe(self._channel.stop_consuming)
+
+    def _on_message(
+        self,
+        channel: BlockingChannel,
+        method: Basic.Deliver,
+        properties: BasicProperties,
+        body: bytes,
+    ) -> None:
+        if self.broker._is_duplicate(
+            self.broker._dedup_key(self.queue_name, properties)
+        ):
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            return
+
+        try:
+            obj = self.broker._deserialize(
+                body, properties.content_type, properties.content_encoding
+            )
+
+        except Exception as error:
+            logger.error(
+                f"Failed to deserialize a message from '{self.queue_name}': {error}"
+            )
+            channel.basic_reject(delivery_tag=method.delivery_tag, requeue=False)
+            return
+
+        lane = self._lanes[hash(self.key(obj)) % len(self._lanes)]
+        future = lane.submit(self.handler, obj)
+        future.add_done_callback(
+            partial(self._on_done, channel, method.delivery_tag, properties, body, obj)
+        )
+
+    def _on_done(
+        self,
+        channel: BlockingChannel,
+        delivery_tag: int,
+        properties: BasicProperties,
+        body: bytes,
+        obj: Any,
+        future: Future,
+    ) -> None:
+        # Called from a worker thread, while the channel
+        # may be used only from the connection thread.
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Handler failed on <{obj}>: {error}")
+
+        self.broker.connection.add_callback_threadsafe(
+            partial(self._settle, channel, delivery_tag, properties, body, error)
+        )
+
+    def _settle(
+        self,
+        channel: BlockingChannel,
+        delivery_tag: int,
+        properties: BasicProperties,
+        body: bytes,
+        error: Optional[BaseException],
+    ) -> None:
+        # Messages of a closed channel are redelivered by RabbitMQ anyway.
+        if not channel.is_open:
+            return
+
+        if error is None:
+            channel.basic_ack(delivery_tag=delivery_tag)
+            self.broker._remember(self.broker._dedup_key(self.queue_name, properties))
+
+        elif self.broker.quarantine:
+            self.broker._fail_message(
+                queue_name=self.queue_name,
+                body=body,
+                properties=properties,
+                error=error,
+            )
+            channel.basic_ack(delivery_tag=delivery_tag)
+
+        else:
+            channel.basic_reject(delivery_tag=delivery_tag, requeue=False)
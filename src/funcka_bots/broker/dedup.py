@@ -0,0 +1,123 @@
+"""Module "broker".
+
+File:
+    dedup.py
+
+About:
+    File describing the Deduplicator class, an idempotency
+    cache of the handled message IDs used by the consumers
+    to drop redelivered messages.
+"""
+
+import time
+from math import ceil
+from threading import Lock
+from collections import OrderedDict
+from typing import Optional
+from redis import Redis
+from funcka_bots.credentials import RedisCredentials
+
+
+class Deduplicator:
+    """Idempotency cache of handled message IDs.
+
+    Description:
+        The IDs are kept in a bounded in-memory LRU, each
+        for `ttl` seconds. If Redis credentials are given,
+        the IDs are also stored in Redis, so they are shared
+        between consumer processes and survive restarts,
+        while the LRU saves a Redis round-trip on hot IDs.
+
+    Attributes:
+        maxsize (int): Maximum count of IDs kept in memory.
+        ttl (float): Time an ID is kept, in seconds.
+        hits (int): Count of lookups of already handled IDs.
+        misses (int): Count of lookups of new IDs.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 100_000,
+        ttl: float = 3600.0,
+        redis_creds: Optional[RedisCredentials] = None,
+        namespace: str = "funcka_bots:dedup",
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = Lock()
+        self._redis = None
+        if redis_creds is not None:
+            self._redis = Redis(
+                host=redis_creds.host,
+                port=redis_creds.port,
+                db=redis_creds.db,
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups that found an already handled ID."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def seen(self, key: str) -> bool:
+        """Checks whether the message ID was already handled.
+
+        :param str key: Message ID.
+        :rtype: bool
+        """
+        now = time.monotonic()
+        with self._lock:
+            expires = self._entries.get(key)
+            if expires is not None:
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True
+
+                del self._entries[key]
+
+        if self._redis is not None and self._redis.exists(self._redis_key(key)):
+            self._store(key, now)
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        return False
+
+    def remember(self, key: str) -> None:
+        """Marks the message ID as handled.
+
+        :param str key: Message ID.
+        """
+        self._store(key, time.monotonic())
+        if self._redis is not None:
+            self._redis.set(self._redis_key(key), 1, ex=ceil(self.ttl))
+
+    def as_dict(self) -> dict:
+        """Converts the counters to a dictionary, for logging
+        and metrics export.
+        """
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def _store(self, key: str, now: float) -> None:
+        with self._lock:
+            self._entries[key] = now + self.ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
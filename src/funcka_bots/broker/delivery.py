@@ -0,0 +1,99 @@
+"""Module "broker".
+
+File:
+    delivery.py
+
+About:
+    File describing the Delivery class, a handle of
+    a message received in manual acknowledgement mode.
+"""
+
+from typing import Any, Callable, Optional
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.spec import BasicProperties
+
+
+class Delivery:
+    """Handle of a received message.
+
+    Description:
+        A delivery that was neither acked nor nacked by the
+        time the consumer asks for the next one is considered
+        handled and is acknowledged with the next batched ack.
+        The handle must be settled before that, from the
+        thread the broker connection is used from.
+
+    Attributes:
+        obj (Any): Deserialized object.
+        delivery_tag (int): Delivery tag on the consuming channel.
+        redelivered (bool): The message was delivered before.
+        body (bytes): Raw message body.
+        properties (BasicProperties): AMQP properties of the message.
+        settled (bool): The message was already acked or nacked.
+        acked (bool): The message was acked through the handle.
+        failed (bool): The handler failure was reported through the handle.
+    """
+
+    def __init__(
+        self,
+        obj: Any,
+        delivery_tag: int,
+        redelivered: bool,
+        body: bytes,
+        properties: BasicProperties,
+        channel: BlockingChannel,
+        on_failure: Optional[Callable[["Delivery", BaseException], None]] = None,
+    ) -> None:
+        self.obj = obj
+        self.delivery_tag = delivery_tag
+        self.redelivered = redelivered
+        self.body = body
+        self.properties = properties
+        self.settled = False
+        self.acked = False
+        self.failed = False
+        self._channel = channel
+        self._on_failure = on_failure
+
+    def __str__(self) -> str:
+        return f"<Delivery <tag: {self.delivery_tag}> | <obj: {self.obj}>>"
+
+    def ack(self) -> None:
+        """Acknowledges the message right away,
+        without waiting for the batched ack.
+        """
+        if not self.settled:
+            self._channel.basic_ack(delivery_tag=self.delivery_tag)
+            self.settled = True
+            self.acked = True
+
+    def nack(self, requeue: bool = True) -> None:
+        """Negatively acknowledges the message.
+
+        :param bool requeue: Return the message to the queue,
+            otherwise it is discarded or dead-lettered. `Default: True`.
+        """
+        if not self.settled:
+            self._channel.basic_nack(delivery_tag=self.delivery_tag, requeue=requeue)
+            self.settled = True
+
+    def fail(self, error: BaseException) -> None:
+        """Reports that the handler failed on the message.
+
+        Description:
+            With the broker quarantine enabled, the message is
+            republished with an incremented failure counter and,
+            after `max_failures` failures, moved to the quarantine
+            queue along with the traceback. Otherwise it is
+            rejected without requeueing.
+
+        :param BaseException error: Error the handler failed with.
+        """
+        if self.settled:
+            return
+
+        self.failed = True
+        if self._on_failure is None:
+            self.nack(requeue=False)
+        else:
+            self._on_failure(self, error)
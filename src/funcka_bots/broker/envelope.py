@@ -0,0 +1,86 @@
+"""Module "broker".
+
+File:
+    envelope.py
+
+About:
+    File describing the Envelope class, a received
+    message whose body is deserialized only on demand.
+"""
+
+from typing import Any, Callable, Dict, Optional
+from pika.spec import BasicProperties
+
+_MISSING = object()
+
+
+class Envelope:
+    """Received message with lazy deserialization.
+
+    Description:
+        Events are published with their routing fields in the
+        AMQP headers, so a router or a filter can inspect them
+        and drop or forward the message without paying for the
+        deserialization. The body is deserialized on the first
+        access to `obj` only.
+
+    Attributes:
+        body (bytes): Raw message body.
+        properties (BasicProperties): AMQP properties of the message.
+    """
+
+    def __init__(
+        self,
+        body: bytes,
+        properties: BasicProperties,
+        deserialize: Callable[[bytes, Optional[str], Optional[str]], Any],
+    ) -> None:
+        self.body = body
+        self.properties = properties
+        self._deserialize = deserialize
+        self._obj = _MISSING
+
+    def __str__(self) -> str:
+        return f"<Envelope <headers: {self.headers}>>"
+
+    @property
+    def headers(self) -> Dict[str, Any]:
+        """AMQP headers of the message."""
+        return self.properties.headers or {}
+
+    @property
+    def event_type(self) -> Optional[str]:
+        return self.headers.get("event_type")
+
+    @property
+    def event_id(self) -> Optional[Any]:
+        return self.headers.get("event_id")
+
+    @property
+    def punishment_type(self) -> Optional[str]:
+        return self.headers.get("punishment_type")
+
+    @property
+    def peer_bpid(self) -> Optional[int]:
+        return self.headers.get("peer_bpid")
+
+    @property
+    def user_uuid(self) -> Optional[int]:
+        return self.headers.get("user_uuid")
+
+    @property
+    def loaded(self) -> bool:
+        """The body was already deserialized."""
+        return self._obj is not _MISSING
+
+    @property
+    def obj(self) -> Any:
+        """Deserialized object. Deserialized on the first access."""
+        if self._obj is _MISSING:
+            self._obj = self._deserialize(
+                self.body,
+                self.properties.content_type,
+                self.properties.content_encoding,
+            )
+
+        return self._obj
@@ -0,0 +1,228 @@
+"""Module "broker".
+
+File:
+    eventlog.py
+
+About:
+    File describing the append-only event log
+    recording the messages passing through brokers.
+"""
+
+import os
+import mmap
+import time
+import struct
+from threading import Lock
+from typing import Any, ByteString, Iterator, Optional, Tuple
+from loguru import logger
+from .codecs import get_codec_by_content_type
+from .objects import LogRecord
+
+# Layout, version 1 (all numbers are little-endian):
+#
+#   header   magic "FELOG", version (u8)
+#   records  length of the rest of the record (u32),
+#            timestamp in nanoseconds (i64),
+#            length of the content type (u8), content type,
+#            message body
+#
+# A record cut short by a crash of the writer ends the log
+# for the readers, and is truncated by the next writer.
+LOG_MAGIC = b"FELOG"
+LOG_VERSION = 1
+
+LOG_HEADER = struct.Struct("<5sB")
+RECORD = struct.Struct("<IqB")
+LENGTH_SIZE = 4
+
+
+def _scan(data: ByteString) -> Iterator[Tuple[int, int, int, int]]:
+    """Iterates over the complete records of a mapped log.
+
+    :return: Start and end offsets, timestamp and content type
+        length of each record.
+    :rtype: Iterator[Tuple[int, int, int, int]]
+    """
+    end = len(data)
+    position = LOG_HEADER.size
+    while position + RECORD.size <= end:
+        length, timestamp, type_length = RECORD.unpack_from(data, position)
+        stop = position + LENGTH_SIZE + length
+        if stop > end:
+            return
+
+        yield position, stop, timestamp, type_length
+        position = stop
+
+
+def _check_header(data: ByteString, path: str) -> None:
+    magic, version = LOG_HEADER.unpack_from(data, 0)
+    if magic != LOG_MAGIC or version > LOG_VERSION:
+        raise ValueError(
+            f"The file <{path}> is not an event log of the version {LOG_VERSION}."
+        )
+
+
+class EventLogWriter:
+    """Appending writer of the event log.
+
+    Description:
+        Messages are stored encoded, as they are sent to
+        RabbitMQ, but uncompressed, so they are recorded
+        without serializing them again. Writing is thread-safe.
+        The writes are buffered: call `flush` to make the
+        records visible to readers, and `close` when done.
+
+    Attributes:
+        path (str): Path to the log file.
+        records (int): Count of records appended by the writer.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param str path: Path to the log file. Created if missing, appended otherwise.
+        """
+        self.path = path
+        self.records = 0
+        self._lock = Lock()
+        self._file = open(path, "a+b")
+        try:
+            self._repair()
+
+        except BaseException:
+            self._file.close()
+            raise
+
+        if self._file.tell() == 0:
+            self._file.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+
+    def _repair(self) -> None:
+        """Truncates the log to its last complete record, dropping
+        a record cut short by a crash, so the new records are
+        not appended after it.
+        """
+        size = self._file.tell()
+        if size == 0:
+            return
+
+        with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if size < LOG_HEADER.size:
+                # The header itself was cut short.
+                header = LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION)
+                if not header.startswith(data[:]):
+                    raise ValueError(f"The file <{self.path}> is not an event log.")
+                valid = 0
+            else:
+                _check_header(data, self.path)
+                valid = LOG_HEADER.size
+                for _, stop, _, _ in _scan(data):
+                    valid = stop
+
+        if valid < size:
+            logger.warning(
+                f"Truncating {size - valid} bytes of an incomplete record "
+                f"from the event log '{self.path}'."
+            )
+            self._file.truncate(valid)
+            self._file.seek(valid)
+
+    def __enter__(self) -> "EventLogWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def append(
+        self,
+        data: ByteString,
+        content_type: Optional[str],
+        timestamp: Optional[int] = None,
+    ) -> None:
+        """Appends an encoded message to the log.
+
+        :param ByteString data: Encoded message, uncompressed.
+        :param Optional[str] content_type: AMQP content type of the message.
+        :param Optional[int] timestamp: Time of the record, in nanoseconds
+            since the epoch. `Default: now`.
+        """
+        encoded_type = (content_type or "").encode()
+        if timestamp is None:
+            timestamp = time.time_ns()
+
+        header = RECORD.pack(
+            RECORD.size - LENGTH_SIZE + len(encoded_type) + len(data),
+            timestamp,
+            len(encoded_type),
+        )
+        with self._lock:
+            self._file.write(header + encoded_type)
+            self._file.write(data)
+            self.records += 1
+
+    def flush(self) -> None:
+        """Writes the buffered records to the file."""
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        """Flushes and closes the log file."""
+        with self._lock:
+            self._file.close()
+
+
+class EventLogReader:
+    """Memory-mapped reader of the event log.
+
+    Description:
+        The log is mapped into memory, so it is scanned
+        without reading it into buffers. Records appended
+        after the reader was opened are not visible to it.
+
+    Attributes:
+        path (str): Path to the log file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param str path: Path to the log file.
+        :raises ValueError: The file is not an event log, or it has a newer version.
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        if os.fstat(self._file.fileno()).st_size < LOG_HEADER.size:
+            self._file.close()
+            raise ValueError(f"The file <{path}> is not an event log.")
+
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            _check_header(self._map, path)
+
+        except ValueError:
+            self.close()
+            raise
+
+    def __enter__(self) -> "EventLogReader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[LogRecord]:
+        """Iterates over the records, in the order of appending."""
+        data = self._map
+        for start, stop, timestamp, type_length in _scan(data):
+            type_start = start + RECORD.size
+            content_type = data[type_start : type_start + type_length].decode() or None
+            yield LogRecord(
+                timestamp, content_type, data[type_start + type_length : stop]
+            )
+
+    def events(self) -> Iterator[Any]:
+        """Iterates over the decoded messages, in the order of appending."""
+        for record in self:
+            yield get_codec_by_content_type(record.content_type).decode(record.body)
+
+    def close(self) -> None:
+        """Unmaps and closes the log file."""
+        self._map.close()
+        self._file.close()
@@ -0,0 +1,413 @@
+"""Module "broker".
+
+File:
+    local.py
+
+About:
+    File describing the LocalBroker class, which passes
+    serialized objects between processes of one host
+    over Unix domain sockets, and the broker factory
+    choosing the transport by configuration.
+"""
+
+import os
+import json
+import socket
+import struct
+import tempfile
+import warnings
+import selectors
+from collections import deque
+from threading import Lock
+from typing import Any, ByteString, Deque, Dict, Iterator, Optional, Tuple
+from loguru import logger
+from funcka_bots.credentials import RabbitMQCredentials
+from .base import BaseBroker, Properties
+from .broker import Broker, TIMER_RETRY_DELAY
+from .scheduler import TimerWheel
+
+# Properties length, body length.
+FRAME_HEADER = struct.Struct("!II")
+
+# How often the listener polls RabbitMQ between local messages, in seconds.
+POLL_INTERVAL = 0.01
+
+DEFAULT_SOCKET_DIR = os.path.join(tempfile.gettempdir(), "funcka_bots")
+
+# Options of create_broker applied to both LocalBroker and its fallback.
+SERIALIZATION_OPTIONS = ("codec", "compression", "compression_threshold")
+
+# Options of create_broker applied to the fallback publications only.
+FALLBACK_OPTIONS = ("outbox_path", "local_delay_limit")
+
+# Delivery tag (None for local messages), content type, content encoding, body.
+Received = Tuple[Optional[int], Optional[str], Optional[str], bytes]
+
+
+class LocalBroker(BaseBroker):
+    """Host-local broker class.
+
+    Description:
+        Each queue is a Unix domain socket in `socket_dir`,
+        bound by the process listening to it. Publications are
+        written to the socket as length-prefixed frames over a
+        cached connection, without a round-trip to RabbitMQ.
+        Local messages are not acknowledged: a message is lost
+        if the listener dies before handling it.
+
+        With a fallback broker, objects for queues that are
+        not listened to on this host are published to RabbitMQ,
+        and `listen` consumes the RabbitMQ queue as well, so
+        producers on other hosts still reach the listener.
+
+        The default codec is pickle rather than dill, since
+        both ends run the same code.
+    """
+
+    def __init__(
+        self,
+        socket_dir: str = DEFAULT_SOCKET_DIR,
+        fallback: Optional[Broker] = None,
+        codec: str = "pickle",
+        compression: Optional[str] = None,
+        compression_threshold: int = 1024,
+    ) -> None:
+        super().__init__(
+            creds=None if fallback is None else fallback.creds,
+            codec=codec,
+            compression=compression,
+            compression_threshold=compression_threshold,
+        )
+        self.socket_dir = socket_dir
+        self.fallback = fallback
+        self._sockets: Dict[str, socket.socket] = {}
+        self._sockets_lock = Lock()
+        self._timers: Optional[TimerWheel] = None
+        os.makedirs(socket_dir, exist_ok=True)
+
+    def close(self) -> None:
+        """Closes the publishing sockets and the fallback broker.
+        Delayed objects still pending are lost.
+        """
+        if self._timers is not None:
+            pending = self._timers.stop()
+            self._timers = None
+            if pending:
+                logger.warning(f"{len(pending)} delayed objects have been dropped.")
+
+        with self._sockets_lock:
+            for sock in self._sockets.values():
+                sock.close()
+
+            self._sockets.clear()
+
+        if self.fallback is not None:
+            self.fallback.close()
+
+    def _socket_path(self, queue_name: str) -> str:
+        return os.path.join(self.socket_dir, f"{queue_name}.sock")
+
+    def publish(self, obj: Any, queue_name: str, delay: Optional[float] = None) -> None:
+        """Publishes a serialized object to a queue.
+
+        Description:
+            The object is sent to the local listener of the queue.
+            If there is none, it is published to RabbitMQ through
+            the fallback broker.
+
+            With the fallback broker, a delayed object is held in
+            a RabbitMQ delay queue, as with Broker, and reaches the
+            listener through RabbitMQ. Without it, the object is
+            held in an in-process timer wheel, with a 10ms resolution,
+            and retried every second until the queue is listened to.
+
+        :param Any obj: Object to be serialized and published.
+        :param str queue_name: Name of the queue to publish to.
+        :param Optional[float] delay: Time to hold the object back, in seconds. `Default: None`.
+        :raises ConnectionRefusedError: The queue is not listened to on this host and there is no fallback broker.
+        """
+        body, properties = self._serialize(obj)
+        if delay is not None and delay > 0:
+            if self.fallback is None:
+                self._get_timers().schedule(
+                    item=(queue_name, self._frame(body, properties)), delay=delay
+                )
+                logger.info(
+                    f"Object <{obj}> has been scheduled for the local queue "
+                    f"<{queue_name}> in {delay}s"
+                )
+                return
+
+            queue_name = self.fallback._delay_queue(queue_name, delay)
+
+        elif self._send_local(queue_name, self._frame(body, properties)):
+            logger.info(
+                f"Object <{obj}> has been sent to the local queue <{queue_name}>"
+            )
+            return
+
+        if self.fallback is None:
+            raise ConnectionRefusedError(
+                f"The queue <{queue_name}> is not listened to on this host."
+            )
+
+        if self.fallback._dispatch(body, properties, queue_name):
+            logger.info(f"Object <{obj}> has been sent to the queue <{queue_name}>")
+        else:
+            logger.info(f"Object <{obj}> has been spooled for the queue <{queue_name}>")
+
+    def _get_timers(self) -> TimerWheel:
+        with self._sockets_lock:
+            if self._timers is None:
+                self._timers = TimerWheel(callback=self._fire_timer)
+                self._timers.start()
+
+            return self._timers
+
+    def _fire_timer(self, item: Tuple[str, ByteString]) -> None:
+        queue_name, frame = item
+        if not self._send_local(queue_name, frame):
+            logger.info(
+                f"The queue <{queue_name}> is not listened to on this host. "
+                f"Retrying in {TIMER_RETRY_DELAY}s..."
+            )
+            self._timers.schedule(item=item, delay=TIMER_RETRY_DELAY)
+
+    @staticmethod
+    def _frame(body: bytes, properties: Properties) -> bytes:
+        encoded = json.dumps(properties, separators=(",", ":")).encode()
+        return FRAME_HEADER.pack(len(encoded), len(body)) + encoded + body
+
+    def _send_local(self, queue_name: str, frame: bytes) -> bool:
+        """Writes a frame to the local listener of the queue.
+
+        :return: The frame was written.
+        :rtype: bool
+        """
+        with self._sockets_lock:
+            # A cached connection may belong to a listener that has
+            # exited since, so a failed write is retried once anew.
+            for _ in range(2):
+                sock = self._sockets.get(queue_name)
+                if sock is None:
+                    sock = self._connect_local(queue_name)
+                    if sock is None:
+                        return False
+
+                    self._sockets[queue_name] = sock
+
+                try:
+                    sock.sendall(frame)
+                    return True
+
+                except OSError:
+                    sock.close()
+                    del self._sockets[queue_name]
+
+        return False
+
+    def _connect_local(self, queue_name: str) -> Optional[socket.socket]:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._socket_path(queue_name))
+
+        except OSError:
+            sock.close()
+            return None
+
+        return sock
+
+    def _bind(self, queue_name: str) -> socket.socket:
+        path = self._socket_path(queue_name)
+        if os.path.exists(path):
+            probe = self._connect_local(queue_name)
+            if probe is not None:
+                probe.close()
+                raise RuntimeError(
+                    f"The queue <{queue_name}> is already listened to on this host."
+                )
+
+            # Left over by a listener that did not exit cleanly.
+            os.unlink(path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen()
+        server.setblocking(False)
+        return server
+
+    def listen(
+        self,
+        queue_name: str,
+        td: Optional[float] = None,
+        *,
+        prefetch_count: int = 100,
+    ) -> Iterator[Any]:
+        """Listens to messages on a specified queue and deserializes them.
+
+        Description:
+            Local messages are read from the queue socket. With
+            a fallback broker, the RabbitMQ queue is consumed as
+            well, and its messages are acknowledged when the
+            consumer asks for the next one, as by `Broker.listen`.
+            Only one process of a host can listen to a queue.
+
+        :param str queue_name: Name of the queue to listen to.
+        :param Optional[float] td: Deprecated and ignored, as by `Broker.listen`.
+        :param int prefetch_count: Count of unacknowledged RabbitMQ messages in flight. `Default: 100`.
+        :raises RuntimeError: The queue is already listened to on this host.
+        :return: Deserialized object received from the queue.
+        :rtype: Iterator[Any]
+        """
+        if td is not None:
+            warnings.warn(
+                "The `td` argument of `listen` is deprecated and ignored.",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+
+        server = self._bind(queue_name)
+        selector = selectors.DefaultSelector()
+        selector.register(server, selectors.EVENT_READ)
+        received: Deque[Received] = deque()
+
+        channel = None
+        if self.fallback is not None:
+            channel = self.fallback._get_channel()
+            self.fallback._declare_queue(queue_name=queue_name, channel=channel)
+            channel.basic_qos(prefetch_count=prefetch_count)
+
+            def on_message(_channel, method, properties, body) -> None:
+                received.append(
+                    (
+                        method.delivery_tag,
+                        properties.content_type,
+                        properties.content_encoding,
+                        body,
+                    )
+                )
+
+            channel.basic_consume(queue=queue_name, on_message_callback=on_message)
+
+        logger.info(f"Waiting for messages from the local queue '{queue_name}'...")
+        try:
+            while True:
+                while received:
+                    delivery_tag, content_type, content_encoding, body = (
+                        received.popleft()
+                    )
+                    try:
+                        obj = self._deserialize(body, content_type, content_encoding)
+
+                    except Exception as error:
+                        # Dead-lettered to the quarantine, if the fallback has it.
+                        logger.error(
+                            f"Failed to deserialize a message from '{queue_name}': {error}"
+                        )
+                        if delivery_tag is not None:
+                            channel.basic_reject(
+                                delivery_tag=delivery_tag, requeue=False
+                            )
+                        continue
+
+                    logger.info(f"Received <{obj}> from the queue '{queue_name}'.")
+                    yield obj
+                    if delivery_tag is not None:
+                        channel.basic_ack(delivery_tag=delivery_tag)
+
+                timeout = None if channel is None else POLL_INTERVAL
+                for key, _ in selector.select(timeout):
+                    if key.fileobj is server:
+                        conn, _ = server.accept()
+                        conn.setblocking(False)
+                        selector.register(conn, selectors.EVENT_READ, bytearray())
+                    else:
+                        self._read(key, selector, received)
+
+                if channel is not None:
+                    self.fallback.connection.process_data_events(time_limit=0)
+
+        finally:
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+
+            selector.close()
+            os.unlink(self._socket_path(queue_name))
+            if channel is not None and channel.is_open:
+                channel.close()
+
+    @staticmethod
+    def _read(
+        key: selectors.SelectorKey,
+        selector: selectors.BaseSelector,
+        received: Deque[Received],
+    ) -> None:
+        conn, buffer = key.fileobj, key.data
+        chunk = conn.recv(1 << 16)
+        if not chunk:
+            selector.unregister(conn)
+            conn.close()
+            return
+
+        buffer += chunk
+        offset = 0
+        while len(buffer) - offset >= FRAME_HEADER.size:
+            props_length, body_length = FRAME_HEADER.unpack_from(buffer, offset)
+            end = offset + FRAME_HEADER.size + props_length + body_length
+            if len(buffer) < end:
+                break
+
+            start = offset + FRAME_HEADER.size
+            properties = json.loads(buffer[start : start + props_length])
+            received.append(
+                (
+                    None,
+                    properties.get("content_type"),
+                    properties.get("content_encoding"),
+                    bytes(buffer[start + props_length : end]),
+                )
+            )
+            offset = end
+
+        del buffer[:offset]
+
+
+def create_broker(
+    creds: Optional[RabbitMQCredentials],
+    transport: str = "amqp",
+    socket_dir: str = DEFAULT_SOCKET_DIR,
+    **options: Any,
+) -> BaseBroker:
+    """Creates a broker for the configured transport, so handlers
+    can be moved between hosts without changing their code.
+
+    :param Optional[RabbitMQCredentials] creds: RabbitMQ credentials, None for a host-local broker without a fallback.
+    :param str transport: `amqp` for Broker, `local` for LocalBroker. `Default: amqp`.
+    :param str socket_dir: Directory of the local queue sockets. `Default: <tmp>/funcka_bots`.
+    :param options: Keyword arguments of the RabbitMQ broker. With the local
+        transport, the codec and the compression options apply to both
+        brokers, and the outbox and the local delays to the fallback only.
+    :raises ValueError: Unknown transport, or an option the transport cannot honour.
+    :rtype: BaseBroker
+    """
+    if transport == "amqp":
+        return Broker(creds=creds, **options)
+
+    if transport != "local":
+        raise ValueError(f"Unknown broker transport <{transport}>.")
+
+    supported = SERIALIZATION_OPTIONS
+    if creds is not None:
+        supported += FALLBACK_OPTIONS
+
+    unsupported = sorted(set(options) - set(supported))
+    if unsupported:
+        raise ValueError(
+            f"Options {unsupported} are not supported by the local transport."
+        )
+
+    local_options = {
+        name: value for name, value in options.items() if name in SERIALIZATION_OPTIONS
+    }
+    fallback = None if creds is None else Broker(creds=creds, **options)
+    return LocalBroker(socket_dir=socket_dir, fallback=fallback, **local_options)
@@ -0,0 +1,115 @@
+"""Module "broker".
+
+File:
+    monitor.py
+
+About:
+    File describing the QueueMonitor class, which
+    periodically samples the depth of RabbitMQ queues.
+"""
+
+from threading import Event, Lock, Thread
+from typing import Dict, Iterable, Optional
+from pika.exceptions import AMQPError
+from loguru import logger
+from funcka_bots.credentials import RabbitMQCredentials
+from .broker import Broker
+from .objects import QueueStats
+
+
+class QueueMonitor:
+    """Background sampler of queue depths.
+
+    Description:
+        The queues are sampled every `interval` seconds from
+        a background thread over a connection of its own, so
+        the monitor can run next to consumers and publishers
+        without sharing their channels. The latest samples are
+        available from `latest` and `as_dict`, e.g. for a metrics
+        exporter. A failed sample keeps the previous one.
+
+    Attributes:
+        queues (List[str]): Names of the sampled queues.
+        interval (float): Time between the samples, in seconds.
+    """
+
+    def __init__(
+        self,
+        creds: RabbitMQCredentials,
+        queues: Iterable[str],
+        interval: float = 5.0,
+    ) -> None:
+        """
+        :param RabbitMQCredentials creds: RabbitMQ credentials.
+        :param Iterable[str] queues: Names of the queues to sample.
+        :param float interval: Time between the samples, in seconds. `Default: 5.0`.
+        """
+        self.creds = creds
+        self.queues = list(queues)
+        self.interval = interval
+        self._samples: Dict[str, QueueStats] = {}
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+
+    def start(self) -> None:
+        """Starts the sampling thread."""
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the sampling thread."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def latest(self, queue_name: str) -> Optional[QueueStats]:
+        """Returns the latest sample of a queue,
+        or None if it was not sampled yet.
+
+        :param str queue_name: Name of the queue.
+        :rtype: Optional[QueueStats]
+        """
+        with self._lock:
+            return self._samples.get(queue_name)
+
+    def as_dict(self) -> dict:
+        """Converts the latest samples to a dictionary,
+        for logging and metrics export.
+        """
+        with self._lock:
+            return {
+                queue: {
+                    "messages": sample.messages,
+                    "consumers": sample.consumers,
+                    "sampled_at": sample.sampled_at,
+                }
+                for queue, sample in self._samples.items()
+            }
+
+    def _run(self) -> None:
+        broker = Broker(creds=self.creds)
+        try:
+            while not self._stopped.is_set():
+                for queue_name in self.queues:
+                    self._sample(broker, queue_name)
+
+                self._stopped.wait(self.interval)
+
+        finally:
+            broker.close()
+
+    def _sample(self, broker: Broker, queue_name: str) -> None:
+        try:
+            sample = broker.queue_stats(queue_name)
+
+        except AMQPError as e:
+            logger.info(f"Failed to sample the queue '{queue_name}': {e!r}")
+            if broker.connection is None or broker.connection.is_closed:
+                broker._connect(attempts=1)
+
+            return
+
+        with self._lock:
+            self._samples[queue_name] = sample
@@ -0,0 +1,70 @@
+"""Module "broker".
+
+File:
+    objects.py
+
+About:
+    File describing NamedTuple classes returned
+    by the broker methods.
+"""
+
+from typing import NamedTuple, List, Any, Optional
+
+
+class PublishResult(NamedTuple):
+    """Class for representing the outcome of a batch publication.
+
+    Arguments:
+        confirmed (List[Any]): Objects confirmed by RabbitMQ.
+        nacked (List[Any]): Objects rejected by RabbitMQ or left unconfirmed.
+    """
+
+    confirmed: List[Any]
+    nacked: List[Any]
+
+
+class QueueStats(NamedTuple):
+    """Class for representing a sample of the queue state.
+
+    Arguments:
+        queue (str): Name of the queue.
+        messages (int): Count of messages ready for delivery.
+        consumers (int): Count of consumers of the queue.
+        sampled_at (float): Time of the sample, as returned by `time.time`.
+    """
+
+    queue: str
+    messages: int
+    consumers: int
+    sampled_at: float
+
+
+class LogRecord(NamedTuple):
+    """Class for representing a message stored in the event log.
+
+    Arguments:
+        timestamp (int): Time of the record, in nanoseconds since the epoch.
+        content_type (Optional[str]): AMQP content type of the message.
+        body (bytes): Encoded message, uncompressed.
+    """
+
+    timestamp: int
+    content_type: Optional[str]
+    body: bytes
+
+
+class ReplayResult(NamedTuple):
+    """Class for representing the outcome of an event log replay.
+
+    Arguments:
+        messages (int): Count of replayed messages.
+        failures (int): Count of messages the handler failed on.
+        elapsed (float): Duration of the replay, in seconds.
+        max_lag (float): Largest delay of a message behind its
+            scheduled time, in seconds.
+    """
+
+    messages: int
+    failures: int
+    elapsed: float
+    max_lag: float
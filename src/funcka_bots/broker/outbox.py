@@ -0,0 +1,107 @@
+"""Module "broker".
+
+File:
+    outbox.py
+
+About:
+    File describing the Outbox class, a local append-only
+    SQLite spool keeping the messages published while
+    RabbitMQ is unreachable.
+"""
+
+import json
+import sqlite3
+from threading import Lock
+from typing import ByteString, Iterable, List, Tuple
+from .base import Properties
+
+SpooledMessage = Tuple[int, str, ByteString, Properties, str]
+
+
+class Outbox:
+    """Append-only spool of unsent messages.
+
+    Description:
+        Messages are stored in the order they were published
+        and read back in the same order. The spool is safe
+        to use from several threads.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param str path: Path to the SQLite spool file.
+        """
+        self.path = path
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "queue TEXT NOT NULL, "
+            "body BLOB NOT NULL, "
+            "properties TEXT NOT NULL, "
+            "exchange TEXT NOT NULL DEFAULT '')"
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def append(
+        self,
+        queue_name: str,
+        body: ByteString,
+        properties: Properties,
+        exchange: str = "",
+    ) -> None:
+        """Appends a message to the spool.
+
+        :param str queue_name: Name of the queue, or the routing key, the message is published to.
+        :param ByteString body: Message body.
+        :param Properties properties: AMQP properties of the message.
+        :param str exchange: Name of the exchange the message is published to. `Default: ""`.
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO outbox (queue, body, properties, exchange) "
+                "VALUES (?, ?, ?, ?)",
+                (queue_name, bytes(body), json.dumps(properties), exchange),
+            )
+
+    def peek(self, limit: int) -> List[SpooledMessage]:
+        """Returns the oldest spooled messages without removing them.
+
+        :param int limit: Maximum count of messages.
+        :return: Spool ID, queue name, body, properties and exchange of each message.
+        :rtype: List[SpooledMessage]
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, queue, body, properties, exchange "
+                "FROM outbox ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+        return [
+            (id_, queue, body, json.loads(props), exchange)
+            for id_, queue, body, props, exchange in rows
+        ]
+
+    def delete(self, ids: Iterable[int]) -> None:
+        """Removes sent messages from the spool.
+
+        :param Iterable[int] ids: Spool IDs of the messages.
+        """
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "DELETE FROM outbox WHERE id = ?", ((id_,) for id_ in ids)
+            )
+            self._db.execute("COMMIT")
+
+    def close(self) -> None:
+        """Closes the spool file."""
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,180 @@
+"""Module "broker".
+
+File:
+    replay.py
+
+About:
+    File describing the Replayer class, which feeds
+    a recorded event log back into a queue or a handler,
+    and the command line tool running it.
+
+    python -m funcka_bots.broker.replay <log> --queue <name> [--speed N|max]
+    python -m funcka_bots.broker.replay <log> --handler <module:attr> [--speed N|max]
+"""
+
+import os
+import time
+import argparse
+import importlib
+from typing import Any, Callable, Optional
+from loguru import logger
+from funcka_bots.credentials import RabbitMQCredentials
+from .base import BaseBroker
+from .broker import Broker, AsyncBroker
+from .codecs import get_codec_by_content_type
+from .eventlog import EventLogReader
+from .objects import ReplayResult
+
+
+class Replayer:
+    """Replayer of an event log.
+
+    Description:
+        The messages are replayed with the intervals they were
+        recorded with, divided by `speed`, so a log of an evening
+        peak can be reproduced at 1x, sped up, or, with `speed`
+        set to None, fed as fast as the target accepts it. If the
+        target falls behind, the following messages are sent
+        without pauses until it catches up; the largest delay is
+        reported as `max_lag` of the result.
+
+    Attributes:
+        path (str): Path to the event log.
+        speed (Optional[float]): Replay speed factor, None for the maximum speed.
+        limit (Optional[int]): Maximum count of replayed messages.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        speed: Optional[float] = 1.0,
+        limit: Optional[int] = None,
+    ) -> None:
+        """
+        :param str path: Path to the event log.
+        :param Optional[float] speed: Replay speed factor, None for
+            the maximum speed. `Default: 1.0`.
+        :param Optional[int] limit: Maximum count of replayed messages. `Default: all`.
+        :raises ValueError: The speed is not positive.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError(f"Replay speed must be positive, got <{speed}>.")
+
+        self.path = path
+        self.speed = speed
+        self.limit = limit
+
+    def to_handler(self, handler: Callable[[Any], None]) -> ReplayResult:
+        """Replays the log into a handler, e.g. an ABCHandler.
+        Failures of the handler are logged and counted.
+
+        :param Callable[[Any], None] handler: Handler called with each event.
+        :rtype: ReplayResult
+        """
+        return self._replay(handler)
+
+    def to_queue(self, broker: BaseBroker, queue_name: str) -> ReplayResult:
+        """Replays the log into a queue, through the broker.
+        The events are published with the codec of the broker.
+
+        :param BaseBroker broker: Broker or LocalBroker instance.
+        :param str queue_name: Name of the target queue.
+        :raises TypeError: The broker is asynchronous.
+        :rtype: ReplayResult
+        """
+        if isinstance(broker, AsyncBroker):
+            raise TypeError("Replaying through an AsyncBroker is not supported.")
+
+        return self._replay(lambda obj: broker.publish(obj, queue_name))
+
+    def _replay(self, target: Callable[[Any], None]) -> ReplayResult:
+        messages = failures = 0
+        max_lag = 0.0
+        first_timestamp = None
+        started = time.monotonic()
+
+        with EventLogReader(self.path) as reader:
+            for record in reader:
+                if self.limit is not None and messages >= self.limit:
+                    break
+
+                messages += 1
+                try:
+                    codec = get_codec_by_content_type(record.content_type)
+                    obj = codec.decode(record.body)
+
+                except Exception as error:
+                    failures += 1
+                    logger.error(f"Failed to decode a replayed message: {error}")
+                    continue
+
+                if self.speed is not None:
+                    if first_timestamp is None:
+                        first_timestamp = record.timestamp
+
+                    offset = (record.timestamp - first_timestamp) / 1e9 / self.speed
+                    lag = time.monotonic() - started - offset
+                    if lag < 0:
+                        time.sleep(-lag)
+                    else:
+                        max_lag = max(max_lag, lag)
+
+                try:
+                    target(obj)
+
+                except Exception as error:
+                    failures += 1
+                    logger.error(f"Replay target failed on <{obj}>: {error}")
+
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"{messages} messages have been replayed from '{self.path}' "
+            f"in {elapsed:.2f}s, {failures} failed."
+        )
+        return ReplayResult(messages, failures, elapsed, max_lag)
+
+
+def _load_handler(spec: str) -> Callable[[Any], None]:
+    # "package.module:attr", an instance or a class of a handler.
+    module_name, _, attr = spec.partition(":")
+    handler = getattr(importlib.import_module(module_name), attr)
+    return handler() if isinstance(handler, type) else handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replays a recorded event log.")
+    parser.add_argument("log", help="path to the event log")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--queue", help="name of the queue to publish to")
+    target.add_argument("--handler", help="handler to call, as <module:attr>")
+    parser.add_argument(
+        "--speed", default="1", help="speed factor, or <max> (default: 1)"
+    )
+    parser.add_argument("--limit", type=int, help="maximum count of messages")
+    args = parser.parse_args()
+
+    speed = None if args.speed == "max" else float(args.speed)
+    replayer = Replayer(args.log, speed=speed, limit=args.limit)
+    if args.handler is not None:
+        result = replayer.to_handler(_load_handler(args.handler))
+    else:
+        broker = Broker(
+            creds=RabbitMQCredentials(
+                host=os.getenv("RABBITMQ_HOST", "localhost"),
+                port=int(os.getenv("RABBITMQ_PORT", "5672")),
+                vhost=os.getenv("RABBITMQ_VHOST", "/"),
+                user=os.getenv("RABBITMQ_USER", "guest"),
+                pswd=os.getenv("RABBITMQ_PSWD", "guest"),
+            )
+        )
+        result = replayer.to_queue(broker, args.queue)
+        broker.close()
+
+    print(
+        f"messages {result.messages}, failures {result.failures}, "
+        f"elapsed {result.elapsed:.2f}s, max lag {result.max_lag * 1e3:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Module "broker".
+
+File:
+    routing.py
+
+About:
+    File describing the routing keys events are
+    published with to topic exchanges.
+"""
+
+from typing import Any
+from funcka_bots.events.events import VkEvent, Punishment
+
+
+def routing_key(obj: Any) -> str:
+    """Returns the topic routing key of an object.
+
+    Description:
+        VK events are routed as "vk.<event type>" and punishments
+        as "punishment.<punishment type>", with underscores replaced
+        by dots, e.g. "vk.message.new" or "punishment.warn", so
+        queues can be bound with patterns like "vk.message.*".
+        Other objects are routed by their class name.
+
+    :param Any obj: Object to be published.
+    :rtype: str
+    """
+    if isinstance(obj, VkEvent):
+        return "vk." + obj.event_type.replace("_", ".")
+
+    if isinstance(obj, Punishment):
+        return "punishment." + obj.punishment_type.replace("_", ".")
+
+    return type(obj).__name__.lower()
@@ -0,0 +1,127 @@
+"""Module "broker".
+
+File:
+    scheduler.py
+
+About:
+    File describing the TimerWheel class, an in-process
+    scheduler of delayed publications.
+"""
+
+import time
+from math import ceil
+from threading import Event, Lock, Thread
+from typing import Any, Callable, List, Optional, Tuple
+from loguru import logger
+
+
+class TimerWheel:
+    """Hashed timer wheel.
+
+    Description:
+        Timers are put into one of `slots` buckets by their
+        due tick, so scheduling is O(1) regardless of the count
+        of pending timers. A background thread advances the
+        wheel every `resolution` seconds and calls `callback`
+        with the items of the timers that are due. Timers
+        longer than a full turn of the wheel stay in their
+        bucket until the turn they are due in.
+
+    Attributes:
+        resolution (float): Duration of a tick, in seconds.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Any], None],
+        resolution: float = 0.01,
+        slots: int = 4096,
+    ) -> None:
+        """
+        :param Callable callback: Function called with the item of each due timer.
+        :param float resolution: Duration of a tick, in seconds. `Default: 0.01`.
+        :param int slots: Count of buckets in the wheel. `Default: 4096`.
+        """
+        self.resolution = resolution
+        self._callback = callback
+        self._slots: List[List[Tuple[int, Any]]] = [[] for _ in range(slots)]
+        self._tick = 0
+        self._pending = 0
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def start(self) -> None:
+        """Starts the ticking thread."""
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def schedule(self, item: Any, delay: float) -> None:
+        """Schedules a timer.
+
+        :param Any item: Item passed to the callback when the timer is due.
+        :param float delay: Time until the timer is due, in seconds.
+        """
+        ticks = max(1, ceil(delay / self.resolution))
+        with self._lock:
+            due = self._tick + ticks
+            self._slots[due % len(self._slots)].append((due, item))
+            self._pending += 1
+
+    def stop(self) -> List[Tuple[float, Any]]:
+        """Stops the ticking thread.
+
+        :return: Remaining delay, in seconds, and the item of each pending timer.
+        :rtype: List[Tuple[float, Any]]
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        with self._lock:
+            pending = [
+                ((due - self._tick) * self.resolution, item)
+                for slot in self._slots
+                for due, item in slot
+            ]
+            for slot in self._slots:
+                slot.clear()
+
+            self._pending = 0
+
+        return sorted(pending, key=lambda timer: timer[0])
+
+    def _run(self) -> None:
+        # Ticks are counted against the monotonic clock, so a late
+        # wakeup is caught up by the following ticks instead of drifting.
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.resolution
+            wait = next_tick - time.monotonic()
+            if self._stopped.wait(wait if wait > 0 else 0):
+                return
+
+            for item in self._advance():
+                try:
+                    self._callback(item)
+
+                except Exception as e:
+                    logger.error(f"Timer callback failed: {e}")
+
+    def _advance(self) -> List[Any]:
+        with self._lock:
+            self._tick += 1
+            index = self._tick % len(self._slots)
+            slot = self._slots[index]
+            if not slot:
+                return []
+
+            due = [item for tick, item in slot if tick <= self._tick]
+            if due:
+                self._slots[index] = [timer for timer in slot if timer[0] > self._tick]
+                self._pending -= len(due)
+
+            return due
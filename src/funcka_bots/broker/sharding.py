@@ -0,0 +1,80 @@
+"""Module "broker".
+
+File:
+    sharding.py
+
+About:
+    File describing the helpers for spreading a queue
+    over several shard queues by a consistent hash of
+    the message key.
+"""
+
+from hashlib import blake2b
+from typing import Any, Hashable, List
+
+
+def peer_key(obj: Any) -> Hashable:
+    """Ordering key: the bot peer ID of the event.
+    Objects without a peer share one key.
+    """
+    peer = getattr(obj, "peer", None)
+    return None if peer is None else peer.bpid
+
+
+def user_key(obj: Any) -> Hashable:
+    """Ordering key: the unique ID of the event user.
+    Objects without a user share one key.
+    """
+    user = getattr(obj, "user", None)
+    return None if user is None else user.uuid
+
+
+def stable_hash(key: Hashable) -> int:
+    """Returns a 64-bit hash of the key that, unlike the
+    builtin `hash`, is the same in every process.
+    """
+    return int.from_bytes(blake2b(repr(key).encode(), digest_size=8).digest(), "big")
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping, Veach).
+
+    Description:
+        Maps a 64-bit key to one of `buckets` buckets, so that
+        growing the count of buckets from N to N+1 moves only
+        1/(N+1) of the keys.
+    """
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+
+    return bucket
+
+
+def shard_for(key: Hashable, shards: int) -> int:
+    """Returns the shard number of the key.
+
+    :param Hashable key: Message key (e.g. peer ID).
+    :param int shards: Count of shards.
+    :rtype: int
+    """
+    return jump_hash(stable_hash(key), shards)
+
+
+def shard_queue_name(queue_name: str, shard: int) -> str:
+    """Returns the name of the shard queue: "<queue>.<shard>"."""
+    return f"{queue_name}.{shard}"
+
+
+def claim_shards(shards: int, consumer_index: int, consumers: int) -> List[int]:
+    """Splits the shards evenly between the consumers.
+
+    :param int shards: Count of shards.
+    :param int consumer_index: Index of the consumer, from 0 to `consumers - 1`.
+    :param int consumers: Count of consumers.
+    :return: Shard numbers claimed by the consumer.
+    :rtype: List[int]
+    """
+    return [shard for shard in range(shards) if shard % consumers == consumer_index]
@@ -0,0 +1,51 @@
+"""Module "broker".
+
+File:
+    stats.py
+
+About:
+    File describing the broker statistics counters.
+"""
+
+
+class BrokerStats:
+    """Broker statistics counters.
+
+    Description:
+        Counters are updated without locking, so under
+        concurrent use they are approximate.
+
+    Attributes:
+        compressed_messages (int): Count of compressed outgoing messages.
+        raw_bytes (int): Size of the compressed messages before compression.
+        compressed_bytes (int): Size of the compressed messages after compression.
+        compression_time (float): CPU time spent on compression, in seconds.
+        decompressed_messages (int): Count of decompressed incoming messages.
+        decompression_time (float): CPU time spent on decompression, in seconds.
+    """
+
+    def __init__(self) -> None:
+        self.compressed_messages = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.compression_time = 0.0
+        self.decompressed_messages = 0
+        self.decompression_time = 0.0
+
+    @property
+    def compression_ratio(self) -> float:
+        """Ratio of the raw size to the compressed size
+        of the compressed messages. `1.0` if there were none.
+        """
+        if not self.compressed_bytes:
+            return 1.0
+
+        return self.raw_bytes / self.compressed_bytes
+
+    def as_dict(self) -> dict:
+        """Converts the counters to a dictionary, for logging
+        and metrics export.
+        """
+        dict_repr = dict(vars(self))
+        dict_repr["compression_ratio"] = self.compression_ratio
+        return dict_repr
@@ -9,9 +9,15 @@ About:
 
 from .events import BaseEvent
 from .builder import EventBuilder as event_builder
+from .interning import InternCache, enable_interning, disable_interning
+from .batch import EventBatch
 
 
 __all__ = (
     "BaseEvent",
     "event_builder",
+    "InternCache",
+    "enable_interning",
+    "disable_interning",
+    "EventBatch",
 )
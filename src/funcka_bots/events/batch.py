@@ -0,0 +1,280 @@
+"""Module "events".
+
+File:
+    batch.py
+
+About:
+    File describing the EventBatch class, a columnar
+    view of events for vectorized analytics.
+"""
+
+from hashlib import blake2b
+from typing import Iterable, Optional, Sequence, Tuple, Union
+from .events import BaseEvent
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# A column name, or a tuple of them for a composite key.
+GroupKey = Union[str, Tuple[str, ...]]
+
+COLUMNS = (
+    "user_uuid",
+    "peer_bpid",
+    "text_length",
+    "attachment_count",
+    "text_hash",
+    "timestamp",
+)
+
+
+def text_hash(text: str) -> int:
+    """Returns a 64-bit hash of the text, stable across processes.
+
+    Args:
+        text (str): Message text.
+
+    Returns:
+        int: Hash of the text, 0 for an empty text.
+    """
+
+    if not text:
+        return 0
+
+    return int.from_bytes(blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("EventBatch requires the optional `numpy` package.")
+
+
+class EventBatch:
+    """Columnar batch of events.
+
+    Description:
+        Keeps the fields moderation checks count over as NumPy
+        arrays, one element per event, so spam and flood checks
+        over thousands of events run as a few vectorized passes
+        instead of Python loops. Requires the optional `numpy`
+        package.
+
+        Events without a message have zero text length, attachment
+        count and text hash. Texts are compared by their hash, so
+        the duplicates of a text are the events sharing a non-zero
+        `text_hash`.
+
+        The window helpers count, for each event, the events of
+        the same group within `window` seconds before it, itself
+        included. Without timestamps the events are numbered in
+        their order, so a window is a count of events.
+
+    Attributes:
+        user_uuid (np.ndarray): User IDs, int64.
+        peer_bpid (np.ndarray): Peer IDs, int64.
+        text_length (np.ndarray): Message text lengths, int32.
+        attachment_count (np.ndarray): Message attachment counts, int32.
+        text_hash (np.ndarray): Message text hashes, uint64.
+        timestamp (np.ndarray): Event times in seconds, float64.
+    """
+
+    def __init__(
+        self,
+        user_uuid: "np.ndarray",
+        peer_bpid: "np.ndarray",
+        text_length: "np.ndarray",
+        attachment_count: "np.ndarray",
+        text_hash: "np.ndarray",
+        timestamp: "np.ndarray",
+    ) -> None:
+        _require_numpy()
+        self.user_uuid = user_uuid
+        self.peer_bpid = peer_bpid
+        self.text_length = text_length
+        self.attachment_count = attachment_count
+        self.text_hash = text_hash
+        self.timestamp = timestamp
+
+    def __len__(self) -> int:
+        return len(self.user_uuid)
+
+    @classmethod
+    def from_events(
+        cls,
+        events: Iterable[BaseEvent],
+        timestamps: Optional[Sequence[float]] = None,
+    ) -> "EventBatch":
+        """Builds the columns from events in one pass.
+
+        Args:
+            events (Iterable[BaseEvent]): Events with a peer and a user, e.g. VkEvents.
+            timestamps (Sequence[float], optional): Event times in seconds,
+                e.g. the times they were received. Defaults to the event order.
+
+        Returns:
+            EventBatch: Batch of the events, in their order.
+        """
+
+        _require_numpy()
+        users, peers, lengths, attachments, hashes = [], [], [], [], []
+        for event in events:
+            users.append(event.user.uuid)
+            peers.append(event.peer.bpid)
+
+            message = getattr(event, "message", None)
+            if message is None:
+                lengths.append(0)
+                attachments.append(0)
+                hashes.append(0)
+            else:
+                lengths.append(len(message.text))
+                attachments.append(len(message.attachments))
+                hashes.append(text_hash(message.text))
+
+        if timestamps is None:
+            timestamp = np.arange(len(users), dtype=np.float64)
+        else:
+            timestamp = np.asarray(timestamps, dtype=np.float64)
+
+        return cls(
+            user_uuid=np.array(users, dtype=np.int64),
+            peer_bpid=np.array(peers, dtype=np.int64),
+            text_length=np.array(lengths, dtype=np.int32),
+            attachment_count=np.array(attachments, dtype=np.int32),
+            text_hash=np.array(hashes, dtype=np.uint64),
+            timestamp=timestamp,
+        )
+
+    def select(self, mask: "np.ndarray") -> "EventBatch":
+        """Returns a batch of the events selected by a mask or indices.
+
+        Args:
+            mask (np.ndarray): Boolean mask or indices of the events.
+
+        Returns:
+            EventBatch: Batch of the selected events.
+        """
+
+        return EventBatch(*(getattr(self, column)[mask] for column in COLUMNS))
+
+    def groups(self, by: GroupKey) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Groups the events by one or several columns.
+
+        Args:
+            by (GroupKey): Column name, or a tuple of them,
+                e.g. `("peer_bpid", "user_uuid")`.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Sorted unique keys, and
+                the index of the key of each event. The keys of a
+                composite group are a structured array with a field
+                per column, keeping the dtypes of the columns.
+        """
+
+        if isinstance(by, str):
+            return np.unique(getattr(self, by), return_inverse=True)
+
+        # The columns are grouped by their codes, not by their values,
+        # since stacking columns of different dtypes may promote them
+        # to float64, e.g. int64 and uint64, and merge distinct values.
+        uniques, codes = [], []
+        for column in by:
+            values, inverse = np.unique(getattr(self, column), return_inverse=True)
+            uniques.append(values)
+            codes.append(inverse.reshape(-1))
+
+        rows, inverse = np.unique(np.stack(codes, axis=1), axis=0, return_inverse=True)
+        keys = np.empty(
+            len(rows),
+            dtype=[(column, values.dtype) for column, values in zip(by, uniques)],
+        )
+        for index, (column, values) in enumerate(zip(by, uniques)):
+            keys[column] = values[rows[:, index]]
+
+        return keys, inverse.reshape(-1)
+
+    def count_by(self, by: GroupKey) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Counts the events of each group.
+
+        Args:
+            by (GroupKey): Column name, or a tuple of them.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Sorted unique keys and their counts.
+        """
+
+        keys, inverse = self.groups(by)
+        return keys, np.bincount(inverse, minlength=len(keys))
+
+    def sum_by(self, by: GroupKey, column: str) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Sums a column over each group, e.g. the attachments sent by each user.
+
+        Args:
+            by (GroupKey): Column name, or a tuple of them.
+            column (str): Name of the summed column.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Sorted unique keys and their sums.
+        """
+
+        keys, inverse = self.groups(by)
+        sums = np.bincount(inverse, weights=getattr(self, column), minlength=len(keys))
+        return keys, sums
+
+    def window_count(self, by: GroupKey, window: float) -> "np.ndarray":
+        """Counts, for each event, the events of its group
+        within `window` seconds before it.
+
+        Args:
+            by (GroupKey): Column name, or a tuple of them.
+            window (float): Window length, in seconds.
+
+        Returns:
+            np.ndarray: Count for each event, in the batch order.
+        """
+
+        order, first = self._window_bounds(by, window)
+        counts = np.empty(len(self), dtype=np.int64)
+        counts[order] = np.arange(len(self)) - first + 1
+        return counts
+
+    def window_sum(self, by: GroupKey, column: str, window: float) -> "np.ndarray":
+        """Sums a column, for each event, over the events of
+        its group within `window` seconds before it.
+
+        Args:
+            by (GroupKey): Column name, or a tuple of them.
+            column (str): Name of the summed column.
+            window (float): Window length, in seconds.
+
+        Returns:
+            np.ndarray: Sum for each event, in the batch order.
+        """
+
+        order, first = self._window_bounds(by, window)
+        totals = np.concatenate(([0], np.cumsum(getattr(self, column)[order])))
+        sums = np.empty(len(self), dtype=totals.dtype)
+        sums[order] = totals[1:] - totals[first]
+        return sums
+
+    def _window_bounds(
+        self, by: GroupKey, window: float
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Sorts the events by group and time, and finds for
+        each of them the first sorted event of its window.
+        """
+        _, inverse = self.groups(by)
+        order = np.lexsort((self.timestamp, inverse))
+
+        # Shifting each group past the end of the previous one
+        # lets one search cover all the groups at once.
+        times = self.timestamp[order]
+        if len(times):
+            times = times - times.min()
+            span = times.max() + window + 1
+            times = times + inverse[order] * span
+
+        first = np.searchsorted(times, times - window, side="left")
+        return order, first
@@ -1,6 +1,20 @@
-from typing import Optional, Any, List, Tuple
+import json
+from operator import itemgetter
+from typing import (
+    Optional,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    Type,
+    Union,
+)
 from .events import VkEvent, Punishment, BaseEvent
 from .objects import Payload
+from .interning import intern_object
 from .objects import (
     Peer,
     User,
@@ -13,8 +27,59 @@ from .objects import (
     Unwarn,
 )
 
-ValStructPair = Tuple[Tuple[Payload, Any]]
-AttrValues = List[Tuple[str, Any]]
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+Constructor = Callable[[Payload], Any]
+Resolver = Callable[[int], Optional[Payload]]
+RawUpdates = Union[bytes, bytearray, memoryview, str, dict, Iterable[Any]]
+
+# The fastest available JSON parser.
+loads = json.loads if orjson is None else orjson.loads
+
+# Peer IDs of group chats start from this value.
+CHAT_PEER_OFFSET = 2000000000
+
+
+def compile_constructor(struct: Type[tuple]) -> Constructor:
+    """Creates a constructor building the NamedTuple from
+    a payload positionally, in the field order of the struct.
+
+    Description:
+        The constructor reads the fields straight from the
+        payload with an itemgetter, without unpacking it into
+        keyword arguments. Missing fields raise KeyError,
+        extra fields are ignored.
+
+    Args:
+        struct (Type[tuple]): NamedTuple class.
+
+    Returns:
+        Constructor: Function taking a payload and returning a struct instance.
+    """
+
+    fields = struct._fields
+    if len(fields) == 1:
+        (name,) = fields
+        return lambda payload: tuple.__new__(struct, (payload[name],))
+
+    getter = itemgetter(*fields)
+    return lambda payload: tuple.__new__(struct, getter(payload))
+
+
+def _validating_constructor(struct: Type[tuple]) -> Constructor:
+    return lambda payload: struct(**payload)
+
+
+STRUCTS = (Peer, User, Reply, Reaction, Button, Kick, Warn, Unwarn)
+
+# Struct -> constructor, for the fast and for the debug path.
+CONSTRUCTORS = {struct: compile_constructor(struct) for struct in STRUCTS}
+VALIDATING_CONSTRUCTORS = {
+    struct: _validating_constructor(struct) for struct in STRUCTS
+}
 
 
 class EventBuilder:
@@ -23,8 +88,17 @@ class EventBuilder:
     Description:
         It offers an interface for convenient and centralized
         event construction. It does not require class initialization.
+        The payloads are neither copied nor modified. Peer and
+        User instances are shared between events if interning
+        is enabled, see `enable_interning`.
+
+    Attributes:
+        debug (bool): Validate the payloads against the struct fields,
+            rejecting unexpected ones. Disabled by default.
     """
 
+    debug: bool = False
+
     @classmethod
     def build_vkevent(
         cls,
@@ -55,20 +129,20 @@ class EventBuilder:
             BaseEvent: An instance of the VkEvent class with the attributes set.
         """
 
-        cls._cat_message_payloads(message, message_reply, message_forward)
+        build = VALIDATING_CONSTRUCTORS if cls.debug else CONSTRUCTORS
+        vkevent = VkEvent(event_type=event_type, event_id=event_id)
+        vkevent.peer = intern_object(build[Peer](peer))
+        vkevent.user = intern_object(build[User](user))
 
-        necessary_attributes = ((peer, Peer), (user, User))
-        optional_attributes = (
-            (message, Message),
-            (button, Button),
-            (reaction, Reaction),
-        )
+        if message is not None:
+            vkevent.message = cls._build_message(
+                build, message, message_reply, message_forward
+            )
+        if button is not None:
+            vkevent.button = build[Button](button)
+        if reaction is not None:
+            vkevent.reaction = build[Reaction](reaction)
 
-        vkevent = cls._build_event(
-            event_instance=VkEvent(event_type=event_type, event_id=event_id),
-            necessary_attributes=necessary_attributes,
-            optional_attributes=optional_attributes,
-        )
         return vkevent
 
     @classmethod
@@ -102,69 +176,175 @@ class EventBuilder:
         Returns:
             BaseEvent: An instance of the Punishment class with the attributes set.
         """
-        cls._cat_message_payloads(message, message_reply, message_forward)
-
-        necessary_attributes = ((peer, Peer), (user, User))
-        optional_attributes = (
-            (message, Message),
-            (warn, Warn),
-            (unwarn, Unwarn),
-            (kick, Kick),
-        )
 
-        punishment = cls._build_event(
-            event_instance=Punishment(
-                punishment_type=punishment_type,
-                punishment_comment=punishment_comment,
-            ),
-            necessary_attributes=necessary_attributes,
-            optional_attributes=optional_attributes,
+        build = VALIDATING_CONSTRUCTORS if cls.debug else CONSTRUCTORS
+        punishment = Punishment(
+            punishment_type=punishment_type,
+            punishment_comment=punishment_comment,
         )
+        punishment.peer = intern_object(build[Peer](peer))
+        punishment.user = intern_object(build[User](user))
+
+        if message is not None:
+            punishment.message = cls._build_message(
+                build, message, message_reply, message_forward
+            )
+        if warn is not None:
+            punishment.warn = build[Warn](warn)
+        if unwarn is not None:
+            punishment.unwarn = build[Unwarn](unwarn)
+        if kick is not None:
+            punishment.kick = build[Kick](kick)
+
         return punishment
 
+    @staticmethod
+    def _build_message(
+        build: Dict[type, Constructor],
+        message: Payload,
+        reply: Optional[Payload],
+        forward: Optional[List[Payload]],
+    ) -> Message:
+        build_reply = build[Reply]
+        reply = None if reply is None else build_reply(reply)
+        forward = [] if forward is None else [build_reply(fwd) for fwd in forward]
+
+        if build is VALIDATING_CONSTRUCTORS:
+            return Message(reply=reply, forward=forward, **message)
+
+        return tuple.__new__(
+            Message,
+            (message["cmid"], message["text"], reply, forward, message["attachments"]),
+        )
+
     @classmethod
-    def _build_event(
+    def build_from_vk_updates(
         cls,
-        event_instance: Any,
-        necessary_attributes: ValStructPair = (),
-        optional_attributes: ValStructPair = (),
-    ):
-        attributes_values = cls._unpack_attributes_payloads(
-            necessary=necessary_attributes,
-            optional=optional_attributes,
-        )
+        updates: RawUpdates,
+        peers: Optional[Resolver] = None,
+        users: Optional[Resolver] = None,
+    ) -> Iterator[BaseEvent]:
+        """Builds VkEvent instances from raw VK updates in one pass.
 
-        cls._set_event_attributes(attributes_values, event_instance)
-        return event_instance
+        Description:
+            Accepts a Bots Long Poll response, a Callback API body,
+            or a list of them, either parsed or as raw JSON. Raw JSON
+            is parsed with orjson, if it is installed. The
+            "message_new", "message_event" and "message_reaction_event"
+            updates are converted, others are skipped. A removed
+            reaction is reported with the `rid` set to None.
 
-    @classmethod
-    @staticmethod
-    def _cat_message_payloads(message, reply, forward) -> None:
-        if message:
-            message["reply"] = reply if reply is None else Reply(**reply)
-            message["forward"] = (
-                [] if forward is None else [Reply(**fwd) for fwd in forward]
-            )
+            Updates carry no chat and user names, so they are
+            looked up with the resolvers, e.g. in a local cache.
+            Without a resolver, or if it returns None, the names
+            are left empty.
 
-    @classmethod
-    @staticmethod
-    def _unpack_attributes_payloads(
-        necessary: ValStructPair,
-        optional: ValStructPair,
-    ) -> AttrValues:
-        attr_values = []
+        Args:
+            updates (RawUpdates): VK updates.
+            peers (Resolver, optional): Returns the Peer payload by the peer ID.
+            users (Resolver, optional): Returns the User payload by the user ID.
 
-        for attr, struct in necessary:
-            attr_values.append((struct.__name__.lower(), struct(**attr)))
+        Returns:
+            Iterator[BaseEvent]: VkEvent instances, in the order of the updates.
+        """
 
-        for attr, struct in optional:
-            if attr is not None:
-                attr_values.append((struct.__name__.lower(), struct(**attr)))
+        for update in cls._iter_updates(updates):
+            update_type = update.get("type")
+            builder = _UPDATE_BUILDERS.get(update_type)
+            if builder is None:
+                continue
 
-        return attr_values
+            obj = update["object"]
+            vkevent = VkEvent(event_type=update_type, event_id=update.get("event_id"))
+            peer_id, user_id = builder(obj, vkevent)
+            vkevent.peer = _resolve_peer(peer_id, peers)
+            vkevent.user = _resolve_user(user_id, users)
+            yield vkevent
 
     @classmethod
-    @staticmethod
-    def _set_event_attributes(attributes_values: AttrValues, event: BaseEvent) -> None:
-        for name, value in attributes_values:
-            event.add_object(name=name, value=value)
+    def _iter_updates(cls, updates: RawUpdates) -> Iterator[dict]:
+        if isinstance(updates, (bytes, bytearray, memoryview, str)):
+            updates = loads(updates)
+
+        if isinstance(updates, dict):
+            if "updates" in updates:
+                yield from updates["updates"]
+            else:
+                yield updates
+            return
+
+        for update in updates:
+            yield from cls._iter_updates(update)
+
+
+def _resolve_peer(peer_id: int, peers: Optional[Resolver]) -> Peer:
+    payload = None if peers is None else peers(peer_id)
+    if payload is None:
+        # Only group chats have a chat ID, direct messages have 0.
+        cid = peer_id - CHAT_PEER_OFFSET if peer_id > CHAT_PEER_OFFSET else 0
+        return intern_object(Peer(peer_id, cid, ""))
+
+    return intern_object(CONSTRUCTORS[Peer](payload))
+
+
+def _resolve_user(user_id: int, users: Optional[Resolver]) -> User:
+    payload = None if users is None else users(user_id)
+    if payload is None:
+        return intern_object(User(user_id, "", "", "", ""))
+
+    return intern_object(CONSTRUCTORS[User](payload))
+
+
+def _reply(message: dict) -> Reply:
+    return Reply(
+        message.get("from_id"),
+        message.get("conversation_message_id"),
+        message.get("text", ""),
+    )
+
+
+def _attachments(message: dict) -> List[str]:
+    # Only the media with an owner are addressable as "<type><owner>_<id>".
+    attachments = []
+    for attachment in message.get("attachments", ()):
+        kind = attachment.get("type")
+        media = attachment.get(kind)
+        if isinstance(media, dict) and "owner_id" in media and "id" in media:
+            attachments.append(f"{kind}{media['owner_id']}_{media['id']}")
+
+    return attachments
+
+
+def _message_new(obj: dict, vkevent: VkEvent) -> Tuple[int, int]:
+    # Before API 5.103 the object is the message itself.
+    message = obj.get("message", obj)
+    reply = message.get("reply_message")
+    vkevent.message = Message(
+        message["conversation_message_id"],
+        message.get("text", ""),
+        None if reply is None else _reply(reply),
+        [_reply(fwd) for fwd in message.get("fwd_messages", ())],
+        _attachments(message),
+    )
+    return message["peer_id"], message["from_id"]
+
+
+def _message_event(obj: dict, vkevent: VkEvent) -> Tuple[int, int]:
+    vkevent.button = Button(
+        obj["conversation_message_id"], obj["event_id"], obj.get("payload")
+    )
+    return obj["peer_id"], obj["user_id"]
+
+
+def _message_reaction_event(obj: dict, vkevent: VkEvent) -> Tuple[int, int]:
+    vkevent.reaction = Reaction(obj["cmid"], obj.get("reaction_id"))
+    return obj["peer_id"], obj["reacted_id"]
+
+
+# Update type -> function setting the event objects and
+# returning the peer ID and the user ID of the update.
+_UPDATE_BUILDERS: Dict[str, Callable[[dict, VkEvent], Tuple[int, int]]] = {
+    "message_new": _message_new,
+    "message_event": _message_event,
+    "message_reaction_event": _message_reaction_event,
+}
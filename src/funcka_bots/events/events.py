@@ -7,14 +7,35 @@ About:
     File describing custom Event class.
 """
 
-from typing import Dict, Union, Any
+from typing import Dict, Union, Any, ByteString, Optional, Tuple
 from abc import ABC, abstractmethod
-
+from operator import attrgetter
+from .objects import (
+    Peer,
+    User,
+    Message,
+    Reaction,
+    Button,
+    Kick,
+    Warn,
+    Unwarn,
+)
+from .interning import intern_field
 
 Payload = Dict[str, Union[str, int]]
 
 
 class ABCEvent(ABC):
+    """The abstract event.
+
+    Description:
+        Events are slotted: each event class declares all its
+        attributes in `__slots__`, so instances carry no `__dict__`.
+        Optional attributes are set to None by the constructors.
+    """
+
+    __slots__ = ()
+
     @abstractmethod
     def __str__(self) -> str:
         pass
@@ -22,25 +43,73 @@ class ABCEvent(ABC):
     def __repr__(self) -> str:
         return self.__str__()
 
+    @classmethod
+    def _fields(cls) -> Tuple[str, ...]:
+        """Returns the names of the slots of the class and
+        its bases. Computed once per class.
+        """
+        fields = cls.__dict__.get("_field_names")
+        if fields is None:
+            fields = tuple(
+                name
+                for klass in reversed(cls.__mro__)
+                for name in klass.__dict__.get("__slots__", ())
+            )
+            cls._field_names = fields
+            cls._field_getter = attrgetter(*fields) if len(fields) > 1 else None
+
+        return fields
+
+    def _values(self) -> Dict[str, Any]:
+        """Returns the attributes of the event, the slotted ones
+        first, then those of the instance dictionary, if any.
+        """
+        fields = self._fields()
+        getter = self.__class__._field_getter
+        if getter is None:
+            values = {name: getattr(self, name) for name in fields}
+        else:
+            values = dict(zip(fields, getter(self)))
+
+        values.update(getattr(self, "__dict__", ()))
+        return values
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # A dictionary of the attributes, as events were pickled
+        # before the slots were introduced, so the package versions
+        # before and after them load the events of each other.
+        return self._values()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        fields = self._fields()
+        for name in fields:
+            setattr(self, name, intern_field(name, state.get(name)))
+
+        for name, value in state.items():
+            if name not in fields:
+                setattr(self, name, value)
+
     def as_dict(self) -> Payload:
         """Converts the ABCEvent object to a dictionary.
 
         Description:
             This method is used only for logging
             purposes and is not intended for future
-            data exchange.
+            data exchange. Attributes set to None are skipped.
 
         Returns:
             dict: Dictionary representation.
         """
 
         dict_repr = {}
-        for attr, value in vars(self).items():
-            if not callable(value) and not attr.startswith("__"):
-                if isinstance(value, tuple):
-                    dict_repr[attr] = value._asdict()
-                else:
-                    dict_repr[attr] = value
+        for attr, value in self._values().items():
+            if value is None:
+                continue
+
+            if isinstance(value, tuple):
+                dict_repr[attr] = value._asdict()
+            else:
+                dict_repr[attr] = value
 
         return dict_repr
 
@@ -55,20 +124,60 @@ class BaseEvent(ABCEvent):
         VkEvent, Punishment, etc.
     """
 
+    __slots__ = ()
+
     def __str__(self) -> str:
         return "<The basic event of the bot.>"
 
     def add_object(self, name: str, value: Any) -> None:
-        """Adds the event data object as an attribute
-        of the class.
+        """Sets the event data object attribute.
 
         Args:
-            name (str): Object name.
+            name (str): Object name, one of the declared attributes.
             value (Any): Object value.
+
+        Raises:
+            AttributeError: The event has no such attribute.
         """
 
         self.__setattr__(name, value)
 
+    def to_bytes(self) -> bytes:
+        """Encodes the event to the versioned binary wire format.
+
+        Raises:
+            TypeError: The event has no wire format.
+
+        Returns:
+            bytes: Encoded event.
+        """
+
+        from . import wire
+
+        return wire.encode_event(self)
+
+    @staticmethod
+    def from_bytes(data: ByteString) -> "BaseEvent":
+        """Decodes an event from the binary wire format.
+
+        Description:
+            The data is read through a memoryview without copying,
+            and the event objects are decoded only when accessed.
+
+        Args:
+            data (ByteString): Encoded event.
+
+        Raises:
+            ValueError: The data is not an event, has a newer version, or is truncated.
+
+        Returns:
+            BaseEvent: VkEvent or Punishment instance.
+        """
+
+        from . import wire
+
+        return wire.decode_event(data)
+
 
 class VkEvent(BaseEvent):
     """Class for representing an vk event.
@@ -78,7 +187,7 @@ class VkEvent(BaseEvent):
         event_type (str): Type of the event.
 
     ---OPTIONAL---
-    Dynamically defined attributes:
+    Attributes set to None if absent:
         Always determined:
             user (User): Data of the user who called the event.
             peer (Peer): Data of the peer where the event occurred.
@@ -89,12 +198,32 @@ class VkEvent(BaseEvent):
             message (Message): Message data.
     """
 
-    event_id: str = None
-    event_type: str = None
+    __slots__ = (
+        "event_type",
+        "event_id",
+        "peer",
+        "user",
+        "message",
+        "button",
+        "reaction",
+    )
+
+    event_id: str
+    event_type: str
+    peer: Optional[Peer]
+    user: Optional[User]
+    message: Optional[Message]
+    button: Optional[Button]
+    reaction: Optional[Reaction]
 
     def __init__(self, event_type: str, event_id: str):
         self.event_type = event_type
         self.event_id = event_id
+        self.peer = None
+        self.user = None
+        self.message = None
+        self.button = None
+        self.reaction = None
 
     def __str__(self) -> str:
         string = (
@@ -115,7 +244,7 @@ class Punishment(BaseEvent):
         comment (str): Comment for punishment.
 
     ---OPTIONAL---
-    Dynamically defined attributes:
+    Attributes set to None if absent:
         Always determined:
             user (User): Data of the user who called the event.
             peer (Peer): Data of the peer where the event occurred.
@@ -128,12 +257,35 @@ class Punishment(BaseEvent):
 
     """
 
-    punishment_type: str = None
-    punishment_comment: str = None
+    __slots__ = (
+        "punishment_type",
+        "punishment_comment",
+        "peer",
+        "user",
+        "message",
+        "warn",
+        "unwarn",
+        "kick",
+    )
+
+    punishment_type: str
+    punishment_comment: str
+    peer: Optional[Peer]
+    user: Optional[User]
+    message: Optional[Message]
+    warn: Optional[Warn]
+    unwarn: Optional[Unwarn]
+    kick: Optional[Kick]
 
     def __init__(self, punishment_type: str, punishment_comment: str) -> None:
         self.punishment_type = punishment_type
         self.punishment_comment = punishment_comment
+        self.peer = None
+        self.user = None
+        self.message = None
+        self.warn = None
+        self.unwarn = None
+        self.kick = None
 
     def __str__(self) -> str:
         string = (
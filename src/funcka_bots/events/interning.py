@@ -0,0 +1,141 @@
+"""Module "events".
+
+File:
+    interning.py
+
+About:
+    File describing the intern cache sharing equal
+    Peer and User instances between events.
+"""
+
+from threading import Lock
+from collections import OrderedDict
+from typing import Any, Optional, Tuple, TypeVar
+
+Struct = TypeVar("Struct", bound=tuple)
+
+# Event attributes holding the interned objects.
+INTERNED_FIELDS = frozenset(("peer", "user"))
+
+
+class InternCache:
+    """Bounded intern cache of immutable event objects.
+
+    Description:
+        Returns a shared instance for every object equal to
+        one seen before, so the same chats and users appearing
+        in many events are kept in memory once. The instances
+        are keyed by their class and all their fields, e.g.
+        `(bpid, cid, name)` for Peer, so a renamed chat gets
+        a new instance. The least recently used instances are
+        evicted above `maxsize`.
+
+    Attributes:
+        maxsize (int): Maximum count of instances kept.
+        hits (int): Count of lookups that returned a shared instance.
+        misses (int): Count of lookups that stored a new instance.
+    """
+
+    def __init__(self, maxsize: int = 10_000) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[type, tuple], tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups that returned a shared instance."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def intern(self, obj: Struct) -> Struct:
+        """Returns the shared instance equal to the object,
+        storing the object if there is none.
+
+        :param Struct obj: NamedTuple instance.
+        :rtype: Struct
+        """
+        key = (obj.__class__, obj)
+        with self._lock:
+            shared = self._entries.get(key)
+            if shared is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return shared
+
+            self._entries[key] = obj
+            self.misses += 1
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return obj
+
+    def clear(self) -> None:
+        """Removes all instances and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def as_dict(self) -> dict:
+        """Converts the counters to a dictionary, for logging
+        and metrics export.
+        """
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+
+# The cache used by the builder and the decoders, None if disabled.
+cache: Optional[InternCache] = None
+
+
+def enable_interning(maxsize: int = 10_000) -> InternCache:
+    """Enables interning of Peer and User instances built by the
+    EventBuilder and restored by pickle, dill, the event codecs
+    and the wire format.
+
+    :param int maxsize: Maximum count of instances kept. `Default: 10000`.
+    :return: The cache, e.g. for reading its statistics.
+    :rtype: InternCache
+    """
+    global cache
+    cache = InternCache(maxsize=maxsize)
+    return cache
+
+
+def disable_interning() -> None:
+    """Disables interning and drops the cache."""
+    global cache
+    cache = None
+
+
+def intern_object(obj: Struct) -> Struct:
+    """Interns the object if interning is enabled.
+
+    :param Struct obj: NamedTuple instance.
+    :rtype: Struct
+    """
+    return obj if cache is None else cache.intern(obj)
+
+
+def intern_field(name: str, value: Any) -> Any:
+    """Interns the value of the event attribute if interning
+    is enabled and the attribute holds a Peer or a User.
+
+    :param str name: Event attribute name.
+    :param Any value: Attribute value.
+    :rtype: Any
+    """
+    if cache is None or value is None or name not in INTERNED_FIELDS:
+        return value
+
+    return cache.intern(value)
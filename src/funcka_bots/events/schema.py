@@ -0,0 +1,135 @@
+"""Module "events".
+
+File:
+    schema.py
+
+About:
+    File describing the field order of the events,
+    shared by the binary encodings of the events.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Type
+from .events import BaseEvent, VkEvent, Punishment
+from .objects import (
+    Peer,
+    User,
+    Message,
+    Reply,
+    Reaction,
+    Button,
+    Kick,
+    Warn,
+    Unwarn,
+)
+
+
+class EventSchema(NamedTuple):
+    """Class for representing the encoded layout of an event class.
+
+    Arguments:
+        tag (str): Name of the class in the event+* codecs.
+        kind (int): Number of the class in the wire format.
+        scalars (Tuple[str, ...]): Scalar attributes, in the encoded order.
+        objects (Tuple[str, ...]): Object attributes, in the encoded order.
+    """
+
+    tag: str
+    kind: int
+    scalars: Tuple[str, ...]
+    objects: Tuple[str, ...]
+
+
+# The order of the attributes is a part of the encoded
+# formats, new attributes may only be appended.
+EVENT_SCHEMAS: Dict[Type[BaseEvent], EventSchema] = {
+    VkEvent: EventSchema(
+        tag="vkevent",
+        kind=1,
+        scalars=("event_type", "event_id"),
+        objects=("peer", "user", "message", "button", "reaction"),
+    ),
+    Punishment: EventSchema(
+        tag="punishment",
+        kind=2,
+        scalars=("punishment_type", "punishment_comment"),
+        objects=("peer", "user", "message", "warn", "unwarn", "kick"),
+    ),
+}
+
+OBJECT_STRUCTS = {
+    "peer": Peer,
+    "user": User,
+    "message": Message,
+    "button": Button,
+    "reaction": Reaction,
+    "warn": Warn,
+    "unwarn": Unwarn,
+    "kick": Kick,
+}
+
+
+def schema_of(cls: type) -> Optional[EventSchema]:
+    """Returns the schema of an event class or of its closest base.
+
+    Args:
+        cls (type): Event class.
+
+    Returns:
+        EventSchema: Schema of the class, None if it has none.
+    """
+
+    for klass in cls.__mro__:
+        schema = EVENT_SCHEMAS.get(klass)
+        if schema is not None:
+            return schema
+
+    return None
+
+
+def flatten_object(value: Optional[tuple]) -> Optional[List[Any]]:
+    """Converts an event object to nested lists of its fields.
+
+    Args:
+        value (tuple, optional): Event object, e.g. Peer or Message.
+
+    Returns:
+        List[Any]: Fields of the object, None if there is no object.
+    """
+
+    if value is None:
+        return None
+
+    if isinstance(value, Message):
+        return [
+            value.cmid,
+            value.text,
+            None if value.reply is None else list(value.reply),
+            [list(fwd) for fwd in value.forward],
+            value.attachments,
+        ]
+
+    return list(value)
+
+
+def restore_object(attr: str, values: List[Any]) -> tuple:
+    """Builds an event object from the nested lists of its fields.
+
+    Args:
+        attr (str): Event attribute holding the object.
+        values (List[Any]): Fields of the object, as returned by `flatten_object`.
+
+    Returns:
+        tuple: Event object.
+    """
+
+    if attr == "message":
+        cmid, text, reply, forward, attachments = values
+        return Message(
+            cmid,
+            text,
+            None if reply is None else Reply(*reply),
+            [Reply(*fwd) for fwd in forward],
+            attachments,
+        )
+
+    return OBJECT_STRUCTS[attr](*values)
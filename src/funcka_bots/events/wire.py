@@ -0,0 +1,360 @@
+"""Module "events".
+
+File:
+    wire.py
+
+About:
+    File describing the versioned binary wire format
+    of the events.
+"""
+
+import copyreg
+import struct
+from operator import attrgetter
+from typing import Any, ByteString, Dict, Tuple, Type
+from .events import BaseEvent
+from .interning import intern_field
+from .schema import EVENT_SCHEMAS, schema_of, restore_object
+
+# Layout, version 1 (all numbers are little-endian):
+#
+#   header   magic "FE", version (u8), kind (u8),
+#            count of scalars (u8), mask of present objects (u16)
+#   scalars  tagged values, in the schema order
+#   objects  for each bit set in the mask: length (u32),
+#            then the object as a tagged list of its fields
+#
+# Strings and lists shorter than 256 are prefixed with
+# a u8 length, longer ones with a u32 length.
+#
+# Scalars and objects may only be appended to a schema. Decoders
+# skip the trailing scalars and objects they do not know, since
+# the objects are length-prefixed.
+MAGIC = b"FE"
+VERSION = 1
+
+HEADER = struct.Struct("<2sBBBH")
+U32 = struct.Struct("<I")
+I32 = struct.Struct("<i")
+I64 = struct.Struct("<q")
+F64 = struct.Struct("<d")
+
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT32 = 3
+TAG_INT64 = 4
+TAG_FLOAT = 5
+TAG_STR = 6
+TAG_BYTES = 7
+TAG_LIST = 8
+TAG_DICT = 9
+TAG_SHORT_STR = 10
+TAG_SHORT_LIST = 11
+
+# Kind -> (event class, scalar attributes, object attributes).
+Schema = Tuple[Type[BaseEvent], Tuple[str, ...], Tuple[str, ...]]
+
+SCHEMAS: Dict[int, Schema] = {
+    schema.kind: (cls, schema.scalars, schema.objects)
+    for cls, schema in EVENT_SCHEMAS.items()
+}
+
+# Marks an object that is present, but not decoded yet.
+_PENDING = object()
+
+
+def encode_event(event: BaseEvent) -> bytes:
+    """Encodes an event to the wire format.
+
+    Args:
+        event (BaseEvent): VkEvent or Punishment instance.
+
+    Raises:
+        TypeError: The event or one of its values is not supported.
+
+    Returns:
+        bytes: Encoded event.
+    """
+
+    kind = _kind_of(type(event))
+    _, scalars, objects = SCHEMAS[kind]
+
+    out = bytearray(HEADER.size)
+    for attr in scalars:
+        _encode_value(out, getattr(event, attr))
+
+    mask = 0
+    for index, attr in enumerate(objects):
+        value = getattr(event, attr)
+        if value is None:
+            continue
+
+        mask |= 1 << index
+        start = len(out)
+        out += b"\0\0\0\0"
+        _encode_value(out, value)
+        U32.pack_into(out, start, len(out) - start - U32.size)
+
+    HEADER.pack_into(out, 0, MAGIC, VERSION, kind, len(scalars), mask)
+    return bytes(out)
+
+
+def decode_event(data: ByteString) -> BaseEvent:
+    """Decodes an event from the wire format.
+
+    Description:
+        The event keeps a memoryview of the buffer, and each
+        object (peer, user, message, ...) is decoded, strings
+        included, only on the first access to it. The buffer
+        must not be modified while the event is in use.
+
+    Args:
+        data (ByteString): Encoded event.
+
+    Raises:
+        ValueError: The data is not an event, has a newer version, or is truncated.
+
+    Returns:
+        BaseEvent: VkEvent or Punishment instance.
+    """
+
+    buffer = memoryview(data)
+    if len(buffer) < HEADER.size:
+        raise ValueError("The encoded event is truncated.")
+
+    magic, version, kind, scalar_count, mask = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("The data is not an encoded event.")
+    if version > VERSION:
+        raise ValueError(f"Unsupported event format version <{version}>.")
+    if kind not in SCHEMAS:
+        raise ValueError(f"Unknown event kind <{kind}>.")
+
+    cls = LAZY_CLASSES[kind]
+    event = cls.__new__(cls)
+
+    try:
+        _decode_fields(event, kind, buffer, scalar_count, mask)
+
+    except (IndexError, struct.error):
+        raise ValueError("The encoded event is truncated.") from None
+
+    return event
+
+
+def _decode_fields(
+    event: BaseEvent, kind: int, buffer: memoryview, scalar_count: int, mask: int
+) -> None:
+    """Decodes the scalars of the event and marks the spans
+    of its objects, which are decoded on access.
+    """
+    _, scalars, objects = SCHEMAS[kind]
+    position = HEADER.size
+    for index in range(scalar_count):
+        value, position = _decode_value(buffer, position)
+        if index < len(scalars):
+            setattr(event, scalars[index], value)
+
+    for attr in scalars[scalar_count:]:
+        setattr(event, attr, None)
+
+    spans = {}
+    for index in range(16):
+        if not mask & (1 << index):
+            if index < len(objects):
+                _SLOTS[kind][index].__set__(event, None)
+            continue
+
+        (length,) = U32.unpack_from(buffer, position)
+        position += U32.size
+        if position + length > len(buffer):
+            raise IndexError(position + length)
+
+        if index < len(objects):
+            spans[objects[index]] = (position, position + length)
+            _SLOTS[kind][index].__set__(event, _PENDING)
+
+        position += length
+
+    event._buffer = buffer
+    event._spans = spans
+
+
+def _kind_of(cls: type) -> int:
+    schema = schema_of(cls)
+    if schema is None:
+        raise TypeError(f"Events of the class <{cls.__name__}> have no wire format.")
+
+    return schema.kind
+
+
+def _encode_value(out: bytearray, value: Any) -> None:
+    if value is None:
+        out.append(TAG_NONE)
+
+    elif value is True or value is False:
+        out.append(TAG_TRUE if value else TAG_FALSE)
+
+    elif isinstance(value, int):
+        if -(2**31) <= value < 2**31:
+            out.append(TAG_INT32)
+            out += I32.pack(value)
+        else:
+            out.append(TAG_INT64)
+            out += I64.pack(value)
+
+    elif isinstance(value, str):
+        encoded = value.encode()
+        if len(encoded) < 256:
+            out.append(TAG_SHORT_STR)
+            out.append(len(encoded))
+        else:
+            out.append(TAG_STR)
+            out += U32.pack(len(encoded))
+        out += encoded
+
+    elif isinstance(value, (tuple, list)):
+        if len(value) < 256:
+            out.append(TAG_SHORT_LIST)
+            out.append(len(value))
+        else:
+            out.append(TAG_LIST)
+            out += U32.pack(len(value))
+        for item in value:
+            _encode_value(out, item)
+
+    elif isinstance(value, dict):
+        out.append(TAG_DICT)
+        out += U32.pack(len(value))
+        for key, item in value.items():
+            _encode_value(out, key)
+            _encode_value(out, item)
+
+    elif isinstance(value, float):
+        out.append(TAG_FLOAT)
+        out += F64.pack(value)
+
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        out.append(TAG_BYTES)
+        out += U32.pack(len(value))
+        out += value
+
+    else:
+        raise TypeError(
+            f"Values of the type <{type(value).__name__}> are not supported."
+        )
+
+
+def _decode_value(buffer: memoryview, position: int) -> Tuple[Any, int]:
+    tag = buffer[position]
+    position += 1
+
+    if tag == TAG_SHORT_STR or tag == TAG_STR:
+        if tag == TAG_SHORT_STR:
+            length = buffer[position]
+            position += 1
+        else:
+            (length,) = U32.unpack_from(buffer, position)
+            position += U32.size
+        if position + length > len(buffer):
+            raise IndexError(position + length)
+        # Decoded straight from the buffer, without an intermediate bytes copy.
+        return str(buffer[position : position + length], "utf-8"), position + length
+
+    if tag == TAG_INT32:
+        return I32.unpack_from(buffer, position)[0], position + I32.size
+
+    if tag == TAG_SHORT_LIST or tag == TAG_LIST:
+        if tag == TAG_SHORT_LIST:
+            count = buffer[position]
+            position += 1
+        else:
+            (count,) = U32.unpack_from(buffer, position)
+            position += U32.size
+        items = []
+        for _ in range(count):
+            item, position = _decode_value(buffer, position)
+            items.append(item)
+        return items, position
+
+    if tag == TAG_NONE:
+        return None, position
+
+    if tag == TAG_INT64:
+        return I64.unpack_from(buffer, position)[0], position + I64.size
+
+    if tag == TAG_DICT:
+        (count,) = U32.unpack_from(buffer, position)
+        position += U32.size
+        items = {}
+        for _ in range(count):
+            key, position = _decode_value(buffer, position)
+            items[key], position = _decode_value(buffer, position)
+        return items, position
+
+    if tag == TAG_TRUE or tag == TAG_FALSE:
+        return tag == TAG_TRUE, position
+
+    if tag == TAG_FLOAT:
+        return F64.unpack_from(buffer, position)[0], position + F64.size
+
+    if tag == TAG_BYTES:
+        (length,) = U32.unpack_from(buffer, position)
+        position += U32.size
+        if position + length > len(buffer):
+            raise IndexError(position + length)
+        return bytes(buffer[position : position + length]), position + length
+
+    raise ValueError(f"Unknown value tag <{tag}>.")
+
+
+def _lazy_property(attr: str, slot: Any) -> property:
+    def get(self):
+        value = slot.__get__(self)
+        if value is _PENDING:
+            start, _ = self._spans[attr]
+            values, _ = _decode_value(self._buffer, start)
+            value = intern_field(attr, restore_object(attr, values))
+            slot.__set__(self, value)
+
+        return value
+
+    def set(self, value):
+        slot.__set__(self, value)
+
+    return property(get, set)
+
+
+def _lazy_class(base: Type[BaseEvent], objects: Tuple[str, ...]) -> type:
+    """Creates a subclass of the event class whose objects
+    are decoded on the first access. Its instances are
+    pickled as instances of the base class.
+    """
+    fields = base._fields()
+    namespace = {
+        "__slots__": ("_buffer", "_spans"),
+        "__module__": __name__,
+        "_field_names": fields,
+        "_field_getter": attrgetter(*fields),
+        "__reduce_ex__": lambda self, protocol: (
+            copyreg._reconstructor,
+            (base, object, None),
+            self.__getstate__(),
+        ),
+    }
+    for attr in objects:
+        namespace[attr] = _lazy_property(attr, base.__dict__[attr])
+
+    return type(f"Wire{base.__name__}", (base,), namespace)
+
+
+LAZY_CLASSES = {
+    kind: _lazy_class(cls, objects) for kind, (cls, _, objects) in SCHEMAS.items()
+}
+
+# Kind -> slot descriptors of the objects, set bypassing the lazy properties.
+_SLOTS = {
+    kind: [cls.__dict__[attr] for attr in objects]
+    for kind, (cls, _, objects) in SCHEMAS.items()
+}
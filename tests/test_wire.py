@@ -0,0 +1,97 @@
+import pickle
+import pytest
+from funcka_bots.events import BaseEvent, event_builder
+from funcka_bots.events.events import VkEvent, Punishment
+from funcka_bots.events import wire
+from funcka_bots.broker.codecs import get_codec
+
+PEER = {"bpid": 2000000001, "cid": 1, "name": "Chat"}
+USER = {
+    "uuid": 123456789,
+    "name": "Ivan Ivanov",
+    "firstname": "Ivan",
+    "lastname": "Ivanov",
+    "nick": "ivan",
+}
+
+
+def vkevent() -> BaseEvent:
+    return event_builder.build_vkevent(
+        event_type="message_new",
+        event_id=2**40,
+        peer=PEER,
+        user=USER,
+        message={"cmid": 42, "text": "привет " * 100, "attachments": ["photo1_2"]},
+        message_reply={"uuid": 1, "cmid": 41, "text": "reply"},
+        message_forward=[{"uuid": 2, "cmid": 40, "text": "fwd"}],
+    )
+
+
+def punishment() -> BaseEvent:
+    return event_builder.build_punishment(
+        punishment_type="warn",
+        punishment_comment="flood",
+        peer=PEER,
+        user=USER,
+        warn={"points": 1},
+    )
+
+
+@pytest.mark.parametrize("factory", [vkevent, punishment])
+def test_round_trip(factory):
+    event = factory()
+    decoded = BaseEvent.from_bytes(event.to_bytes())
+
+    assert isinstance(decoded, type(event))
+    assert decoded.as_dict() == event.as_dict()
+
+
+def test_round_trip_through_pickle_and_codecs():
+    event = vkevent()
+    decoded = BaseEvent.from_bytes(event.to_bytes())
+
+    assert type(pickle.loads(pickle.dumps(decoded))) is VkEvent
+    for name in ("wire", "event+json"):
+        codec = get_codec(name)
+        assert codec.decode(codec.encode(event)).as_dict() == event.as_dict()
+
+
+def test_absent_objects_are_none():
+    event = Punishment(punishment_type="kick", punishment_comment="")
+    decoded = BaseEvent.from_bytes(event.to_bytes())
+
+    assert decoded.peer is None
+    assert decoded.kick is None
+
+
+def test_unknown_version():
+    data = bytearray(vkevent().to_bytes())
+    data[2] = wire.VERSION + 1
+
+    with pytest.raises(ValueError, match="version"):
+        BaseEvent.from_bytes(bytes(data))
+
+
+def test_not_an_event():
+    with pytest.raises(ValueError, match="not an encoded event"):
+        BaseEvent.from_bytes(b"XX" + vkevent().to_bytes()[2:])
+
+
+@pytest.mark.parametrize("length", [0, 3, wire.HEADER.size, 20, -1])
+def test_truncated_input(length):
+    data = vkevent().to_bytes()
+
+    with pytest.raises(ValueError, match="truncated"):
+        BaseEvent.from_bytes(data[:length])
+
+
+def test_every_truncation_is_rejected():
+    data = vkevent().to_bytes()
+    for length in range(len(data)):
+        with pytest.raises(ValueError):
+            BaseEvent.from_bytes(data[:length])
+
+
+def test_unsupported_event():
+    with pytest.raises(TypeError):
+        BaseEvent().to_bytes()